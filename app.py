@@ -1,26 +1,25 @@
 import os
-import csv
-import io
 import time
 import re
+import json
 from datetime import datetime, timedelta
 from threading import Thread
-from flask import request, render_template, redirect, url_for, flash
+from flask import (request, render_template, redirect, url_for, flash, jsonify, send_file,
+                   Response, stream_with_context)
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
 from werkzeug.security import check_password_hash, generate_password_hash
-from apscheduler.schedulers.background import BackgroundScheduler
-
-# --- IMPORTAÇÕES DO SELENIUM ---
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-
-from models import app, db, User, Agendamento, Cliente
+from sqlalchemy import insert
+
+# Só o painel: nada de Selenium nem de agendador aqui. Os envios e o QR Code ficam com o
+# motor de envios (motor_envios.py), em outro processo, e os dois conversam pelo banco.
+from models import (app, db, User, Campanha, Agendamento, Cliente, TentativaEnvio, Pareamento, EstadoMotor,
+                    ImportacaoClientes, MODOS_TEXTO, MODO_PADRAO, ESTADOS_FINAIS)
+from metricas import FASES, AMOSTRA_FASES, resumir_contagens
+from importacao_csv import importar_clientes, novo_progresso
+from midia import salvar_midia
+from indice_despacho import proxima_execucao
+from relatorios import (FORMATOS, STATUS_ENVIO, COLUNAS_ENVIOS, COLUNAS_DIARIO, consulta_envios, consulta_diario,
+                        gerar_relatorio)
 
 # --- Configuração do Login ---
 login_manager = LoginManager()
@@ -34,8 +33,16 @@ if not os.path.exists(UPLOAD_FOLDER):
 if not os.path.exists('static'):
     os.makedirs('static')
 
-scheduler = BackgroundScheduler()
-scheduler.start()
+# Leitura do QR Code: a página espera até TEMPO_LONG_POLL segundos por um QR novo, conferindo o banco
+# a cada INTERVALO_CONSULTA_QR. Um pedido que o motor não pegou em TEMPO_RESPOSTA_MOTOR vira erro.
+TEMPO_LONG_POLL = 25
+INTERVALO_CONSULTA_QR = 1
+TEMPO_RESPOSTA_MOTOR = 30
+# Um pareamento sem notícias há mais que isso ficou órfão (motor reiniciado no meio)
+TEMPO_PAREAMENTO_ORFAO = int(os.environ.get('TIMESEND_TEMPO_PAREAMENTO', 120)) + 30
+
+# Motor sem gravar o retrato há mais que isso está fora do ar
+TEMPO_MOTOR_ATIVO = 90
 
 
 @login_manager.user_loader
@@ -50,18 +57,14 @@ def load_user(user_id):
 @app.route('/')
 @login_required
 def index():
-    # Admin vê tudo
+    # Clientes e agendamentos são carregados sob demanda pela página (/api/clientes e /api/agendamentos)
     if current_user.is_admin:
-        tarefas = Agendamento.query.order_by(Agendamento.id.desc()).all()
         # Admin também recebe a lista de TODOS os usuários para gerenciar
         todos_usuarios = User.query.all()
     else:
-        tarefas = Agendamento.query.filter_by(user_id=current_user.id).order_by(Agendamento.id.desc()).all()
         todos_usuarios = []  # Usuário comum não vê lista de usuários
 
-    clientes = Cliente.query.all()
-    return render_template('dashboard.html', nome=current_user.username, tarefas=tarefas, clientes=clientes,
-                           usuarios=todos_usuarios)
+    return render_template('dashboard.html', nome=current_user.username, usuarios=todos_usuarios)
 
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -92,6 +95,203 @@ def logout():
     return redirect(url_for('login'))
 
 
+# ==========================================
+#        API DO PAINEL (JSON, SOB DEMANDA)
+# ==========================================
+
+TAMANHO_PAGINA = 50
+
+
+def parametros_pagina():
+    # Paginação por chave: a próxima página começa depois do último id recebido (id < antes_de)
+    antes_de = request.args.get('antes_de', type=int)
+    limite = min(request.args.get('limite', TAMANHO_PAGINA, type=int), 200)
+    return antes_de, max(limite, 1)
+
+
+def paginar(query, coluna_id, antes_de, limite):
+    if antes_de:
+        query = query.filter(coluna_id < antes_de)
+    itens = query.order_by(coluna_id.desc()).limit(limite + 1).all()
+    proximo = itens[limite - 1].id if len(itens) > limite else None
+    return itens[:limite], proximo
+
+
+def filtrar_clientes(busca):
+    query = Cliente.query
+    busca = (busca or '').strip()
+    if busca:
+        digitos = re.sub(r'\D', '', busca)
+        condicoes = [Cliente.nome.like(f'%{busca}%')]
+        if digitos:
+            condicoes.append(Cliente.telefone.like(f'%{digitos}%'))
+        query = query.filter(db.or_(*condicoes))
+    return query
+
+
+def filtrar_agendamentos(busca):
+    # Destino + conteúdo da campanha, sem carregar objetos do ORM
+    query = db.session.query(
+        Agendamento.id, Agendamento.destinatario, Agendamento.ativo, Agendamento.campanha_id,
+        Campanha.horario, Campanha.dias_semana, Campanha.mensagem
+    ).join(Campanha, Agendamento.campanha_id == Campanha.id)
+    if not current_user.is_admin:
+        query = query.filter(Agendamento.user_id == current_user.id)
+    busca = (busca or '').strip()
+    if busca:
+        query = query.filter(Agendamento.destinatario.like(f'%{busca}%'))
+    return query
+
+
+@app.route('/api/clientes')
+@login_required
+def api_clientes():
+    antes_de, limite = parametros_pagina()
+    clientes, proximo = paginar(filtrar_clientes(request.args.get('busca')), Cliente.id, antes_de, limite)
+    return jsonify(
+        itens=[{'id': c.id, 'nome': c.nome, 'telefone': c.telefone} for c in clientes],
+        proximo=proximo,
+    )
+
+
+@app.route('/api/agendamentos')
+@login_required
+def api_agendamentos():
+    antes_de, limite = parametros_pagina()
+    tarefas, proximo = paginar(filtrar_agendamentos(request.args.get('busca')), Agendamento.id, antes_de, limite)
+    # Quantos destinos ativos cada campanha da página tem (a edição da mensagem vale para todos)
+    campanhas = {t.campanha_id for t in tarefas}
+    destinos = dict(db.session.query(Agendamento.campanha_id, db.func.count(Agendamento.id)).filter(
+        Agendamento.campanha_id.in_(campanhas), Agendamento.ativo == True).group_by(Agendamento.campanha_id)) \
+        if campanhas else {}
+    return jsonify(
+        itens=[{'id': t.id, 'destinatario': t.destinatario, 'horario': t.horario, 'frequencia': t.dias_semana,
+                'mensagem': t.mensagem or '', 'ativo': t.ativo, 'campanha_id': t.campanha_id,
+                'destinos': destinos.get(t.campanha_id, 0)} for t in tarefas],
+        proximo=proximo,
+    )
+
+
+def filtrar_falhas(busca):
+    # Destinos que saíram da fila por falha (erro definitivo ou tentativas esgotadas)
+    query = db.session.query(
+        Agendamento.id, Agendamento.destinatario, Agendamento.tentativas, Agendamento.falhou_em,
+        Agendamento.erro_final
+    ).filter(Agendamento.falhou_em.isnot(None), Agendamento.ativo == False)
+    if not current_user.is_admin:
+        query = query.filter(Agendamento.user_id == current_user.id)
+    busca = (busca or '').strip()
+    if busca:
+        query = query.filter(Agendamento.destinatario.like(f'%{busca}%'))
+    return query
+
+
+@app.route('/api/falhas')
+@login_required
+def api_falhas():
+    antes_de, limite = parametros_pagina()
+    falhas, proximo = paginar(filtrar_falhas(request.args.get('busca')), Agendamento.id, antes_de, limite)
+    return jsonify(
+        itens=[{'id': f.id, 'destinatario': f.destinatario, 'tentativas': f.tentativas,
+                'falhou_em': f.falhou_em.strftime('%d/%m %H:%M'), 'erro': f.erro_final} for f in falhas],
+        proximo=proximo,
+    )
+
+
+@app.route('/api/metricas')
+@login_required
+def api_metricas():
+    # Vazão, latência por fase (p50/p95) e taxa de falha por usuário nas últimas N horas
+    horas = min(request.args.get('horas', 24, type=int), 24 * 31)
+    desde = datetime.now() - timedelta(hours=horas)
+    filtros = [TentativaEnvio.inicio >= desde]
+    if not current_user.is_admin:
+        filtros.append(TentativaEnvio.user_id == current_user.id)
+    # Contagens agrupadas no banco; p50/p95 sobre as AMOSTRA_FASES tentativas mais recentes da janela
+    contagens = db.session.query(TentativaEnvio.user_id, TentativaEnvio.resultado, db.func.count(TentativaEnvio.id)) \
+        .filter(*filtros).group_by(TentativaEnvio.user_id, TentativaEnvio.resultado)
+    amostra = db.session.query(*[getattr(TentativaEnvio, f't_{fase}') for fase in FASES]).filter(*filtros) \
+        .order_by(TentativaEnvio.inicio.desc()).limit(AMOSTRA_FASES)
+    resumo = resumir_contagens(contagens, amostra, horas * 60)
+    resumo['janela_horas'] = horas
+
+    # Limites da conta e cache de grupos vêm do retrato que cada motor de envios grava no banco
+    motores = estados_motores()
+    usuario = str(current_user.id)
+    resumo['motores'] = len(motores)
+    resumo['limite_envio'] = next((m['limite_envio'][usuario] for m in motores if usuario in m['limite_envio']),
+                                  None)
+    if current_user.is_admin:
+        resumo['cache_grupos'] = motores[0]['cache_grupos_total'] if motores else None
+    else:
+        resumo['cache_grupos'] = next((m['cache_grupos'][usuario] for m in motores if usuario in m['cache_grupos']),
+                                      None)
+    return jsonify(resumo)
+
+
+# ==========================================
+#        RELATÓRIOS (CSV / NDJSON EM FLUXO)
+# ==========================================
+
+# Período padrão quando o pedido não informa ?inicio=
+DIAS_RELATORIO = 30
+
+
+def filtros_relatorio():
+    # ?inicio=AAAA-MM-DD&fim=AAAA-MM-DD (fim incluso). ?usuario=ID só vale para o admin (sem ele, todos);
+    # o usuário comum sempre vê só os próprios envios. Devolve None se algum filtro for inválido.
+    formato = request.args.get('formato', 'csv')
+    if formato not in FORMATOS:
+        return None
+    try:
+        inicio, fim = [datetime.strptime(request.args[nome], '%Y-%m-%d') if request.args.get(nome) else None
+                       for nome in ('inicio', 'fim')]
+    except ValueError:
+        return None
+    if inicio is None:
+        inicio = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=DIAS_RELATORIO)
+    if fim:
+        fim += timedelta(days=1)
+    usuario = request.args.get('usuario', type=int) if current_user.is_admin else current_user.id
+    return formato, usuario, inicio, fim
+
+
+def resposta_relatorio(nome, formato, colunas, consulta):
+    # O corpo é gerado enquanto sai: um lote do cursor por vez, sem montar o arquivo inteiro
+    return Response(stream_with_context(gerar_relatorio(formato, colunas, consulta)), mimetype=FORMATOS[formato],
+                    headers={'Content-Disposition': f'attachment; filename={nome}_{datetime.now():%Y%m%d}.{formato}',
+                             'X-Accel-Buffering': 'no'})
+
+
+@app.route('/relatorios/envios')
+@login_required
+def relatorio_envios():
+    # Cada tentativa de envio com o destino e o resultado (?status=enviado|falha)
+    filtros = filtros_relatorio()
+    status = request.args.get('status') or None
+    if filtros is None or (status and status not in STATUS_ENVIO):
+        return "Filtro inválido", 400
+    formato, usuario, inicio, fim = filtros
+    return resposta_relatorio('envios', formato, COLUNAS_ENVIOS, consulta_envios(usuario, inicio, fim, status))
+
+
+@app.route('/relatorios/diario')
+@login_required
+def relatorio_diario():
+    # Totais por usuário e dia, já somados pelo motor (tabela contador_diario)
+    filtros = filtros_relatorio()
+    if filtros is None:
+        return "Filtro inválido", 400
+    formato, usuario, inicio, fim = filtros
+    return resposta_relatorio('diario', formato, COLUNAS_DIARIO, consulta_diario(usuario, inicio, fim))
+
+
+def estados_motores():
+    recentes = EstadoMotor.query.filter(EstadoMotor.atualizado_em >= datetime.now() - timedelta(
+        seconds=TEMPO_MOTOR_ATIVO)).order_by(EstadoMotor.atualizado_em.desc())
+    return [json.loads(m.dados) for m in recentes if m.dados]
+
+
 # ==========================================
 #           GESTÃO DE USUÁRIOS (ADMIN)
 # ==========================================
@@ -142,8 +342,13 @@ def excluir_usuario(id):
         if user.id == current_user.id:
             flash('Você não pode excluir a si mesmo!')
         else:
-            # Apaga também os agendamentos desse usuário para não ficar lixo no banco
+            # Apaga também os agendamentos, o histórico de envios e o pareamento desse usuário (as FKs não
+            # deixariam apagar o usuário antes). Os totais por dia (contador_diario) ficam para os relatórios.
             Agendamento.query.filter_by(user_id=user.id).delete()
+            Campanha.query.filter_by(user_id=user.id).delete()
+            TentativaEnvio.query.filter_by(user_id=user.id).delete()
+            Pareamento.query.filter_by(user_id=user.id).delete()
+            ImportacaoClientes.query.filter_by(user_id=user.id).delete()
             db.session.delete(user)
             db.session.commit()
             flash(f'Usuário {user.username} excluído com sucesso!')
@@ -164,13 +369,100 @@ def cadastrar_cliente():
     if Cliente.query.filter_by(telefone=telefone_limpo).first():
         flash('Erro: Cliente já cadastrado.')
     else:
-        novo_cliente = Cliente(nome=nome, telefone=telefone_limpo, criado_em=datetime.now().strftime("%d/%m/%Y"))
+        novo_cliente = Cliente(nome=nome, telefone=telefone_limpo, criado_em=datetime.now())
         db.session.add(novo_cliente)
         db.session.commit()
         flash(f'Cliente {nome} salvo!')
     return redirect(url_for('index'))
 
 
+# --- ROTA: IMPORTAÇÃO DE CSV (em segundo plano, por lotes) ---
+# O progresso fica na tabela importacao_clientes (cada worker do painel enxerga o mesmo). Uma importação
+# "processando" sem notícias há mais que isso morreu junto com o worker e não bloqueia uma nova.
+TEMPO_IMPORTACAO_ORFA = 600
+
+
+def gravar_progresso(user_id, progresso):
+    registro = db.session.get(ImportacaoClientes, user_id) or ImportacaoClientes(user_id=user_id)
+    for campo, valor in progresso.items():
+        setattr(registro, campo, valor)
+    registro.atualizado_em = datetime.now()
+    db.session.add(registro)
+    db.session.commit()
+
+
+@app.route('/importar_csv', methods=['POST'])
+@login_required
+def importar_csv():
+    arquivo = request.files.get('arquivo_csv')
+
+    if not arquivo or arquivo.filename == '':
+        flash('Nenhum arquivo selecionado.')
+        return redirect(url_for('index'))
+
+    if not arquivo.filename.lower().endswith('.csv'):
+        flash('Erro: O arquivo deve ser do tipo .CSV')
+        return redirect(url_for('index'))
+
+    andamento = db.session.get(ImportacaoClientes, current_user.id)
+    if andamento and andamento.status == 'processando' and \
+            andamento.atualizado_em >= datetime.now() - timedelta(seconds=TEMPO_IMPORTACAO_ORFA):
+        flash('Já existe uma importação em andamento. Aguarde terminar.')
+        return redirect(url_for('index'))
+
+    # Vai para o disco em pedaços (não carrega o arquivo inteiro na memória)
+    caminho_csv = os.path.join(UPLOAD_FOLDER, f"importacao_{current_user.id}.csv")
+    arquivo.save(caminho_csv)
+
+    progresso = novo_progresso()
+    gravar_progresso(current_user.id, progresso)
+    Thread(target=thread_importacao, args=(caminho_csv, progresso, current_user.id), daemon=True).start()
+    flash('Importação iniciada! O progresso aparece no painel.')
+    return redirect(url_for('index'))
+
+
+@app.route('/importar_csv/progresso')
+@login_required
+def progresso_importacao():
+    andamento = db.session.get(ImportacaoClientes, current_user.id)
+    if andamento is None:
+        return jsonify({})
+    return jsonify(status=andamento.status, linhas=andamento.linhas, novos=andamento.novos,
+                   duplicados=andamento.duplicados, rejeitados=andamento.rejeitados, erro=andamento.erro)
+
+
+@app.route('/importar_csv/rejeitados')
+@login_required
+def rejeitados_importacao():
+    caminho = caminho_rejeitados(current_user.id)
+    if not os.path.exists(caminho):
+        flash('Nenhuma importação encontrada.')
+        return redirect(url_for('index'))
+    return send_file(os.path.abspath(caminho), as_attachment=True, download_name='rejeitados.csv')
+
+
+def caminho_rejeitados(user_id):
+    return os.path.join(UPLOAD_FOLDER, f"importacao_{user_id}_rejeitados.csv")
+
+
+def thread_importacao(caminho_csv, progresso, user_id):
+    with app.app_context():
+        try:
+            importar_clientes(caminho_csv, progresso, caminho_rejeitados(user_id),
+                              ao_lote=lambda p: gravar_progresso(user_id, p))
+            progresso['status'] = 'concluido'
+        except UnicodeDecodeError:
+            progresso['status'] = 'erro'
+            progresso['erro'] = 'O arquivo precisa estar em UTF-8 (no Excel: "CSV UTF-8").'
+        except Exception as e:
+            db.session.rollback()
+            progresso['status'] = 'erro'
+            progresso['erro'] = f'Erro ao ler o arquivo: {e}. Verifique se é um CSV válido.'[:255]
+        finally:
+            gravar_progresso(user_id, progresso)
+            os.remove(caminho_csv)
+
+
 @app.route('/excluir_tarefa/<int:id>')
 @login_required
 def excluir_tarefa(id):
@@ -179,7 +471,12 @@ def excluir_tarefa(id):
         if not current_user.is_admin and tarefa.user_id != current_user.id:
             flash('Acesso negado.')
             return redirect(url_for('index'))
+        campanha_id = tarefa.campanha_id
         db.session.delete(tarefa)
+        db.session.flush()
+        # Último destino da campanha: a campanha (e a referência à imagem) vai junto
+        if campanha_id and not Agendamento.query.filter_by(campanha_id=campanha_id).first():
+            Campanha.query.filter_by(id=campanha_id).delete()
         db.session.commit()
         flash('Agendamento cancelado!')
     return redirect(url_for('index'))
@@ -195,9 +492,32 @@ def editar_tarefa():
         if not current_user.is_admin and tarefa.user_id != current_user.id:
             flash('Acesso negado.')
             return redirect(url_for('index'))
-        tarefa.mensagem = nova_mensagem
+        # A mensagem é da campanha: um único UPDATE vale para todos os destinos
+        Campanha.query.filter_by(id=tarefa.campanha_id).update({'mensagem': nova_mensagem})
         db.session.commit()
-        flash('Mensagem atualizada!')
+        flash('Mensagem da campanha atualizada!')
+    return redirect(url_for('index'))
+
+
+@app.route('/reenviar_falhas', methods=['POST'])
+@login_required
+def reenviar_falhas():
+    # Volta para a fila (agora, com as tentativas zeradas) os destinos marcados, ou todos da lista de falhas
+    query = Agendamento.query.filter(Agendamento.falhou_em.isnot(None), Agendamento.ativo == False)
+    if not current_user.is_admin:
+        query = query.filter(Agendamento.user_id == current_user.id)
+    if not request.form.get('todas'):
+        ids = [int(i) for i in request.form.getlist('falhas')]
+        if not ids:
+            flash('Selecione pelo menos um envio.')
+            return redirect(url_for('index'))
+        query = query.filter(Agendamento.id.in_(ids))
+    quantidade = query.update({
+        'ativo': True, 'tentativas': 0, 'falhou_em': None, 'erro_final': None, 'next_run_at': datetime.now(),
+        'reservado_por': None, 'reservado_ate': None,
+    }, synchronize_session=False)
+    db.session.commit()
+    flash(f'{quantidade} envios voltaram para a fila!')
     return redirect(url_for('index'))
 
 
@@ -214,99 +534,84 @@ def conectar_whatsapp():
 @app.route('/gerar_qrcode')
 @login_required
 def gerar_qrcode():
-    t = Thread(target=thread_qrcode_selenium, args=(current_user.id,))
-    t.start()
-    return "Iniciando processo..."
+    # Grava o pedido para o motor de envios. Se já existe um pareamento rodando, só devolve o estado dele.
+    pareamento = db.session.get(Pareamento, current_user.id)
+    if pareamento is None:
+        pareamento = Pareamento(user_id=current_user.id, versao=0)
+        db.session.add(pareamento)
+    if pareamento.estado is None or retrato_pareamento(pareamento)['estado'] in ESTADOS_FINAIS \
+            or pareamento_orfao(pareamento):
+        pareamento.estado = 'pedido'
+        pareamento.qr = None
+        pareamento.erro = None
+        pareamento.versao = (pareamento.versao or 0) + 1
+        pareamento.atualizado_em = datetime.now()
+        db.session.commit()
+    return jsonify(retrato_pareamento(pareamento))
 
 
-def thread_qrcode_selenium(user_id):
-    driver = None
-    try:
-        options = webdriver.ChromeOptions()
-        dir_path = os.getcwd()
-        pasta_base = os.path.join(dir_path, "sessoes_usuarios")
-        if not os.path.exists(pasta_base): os.makedirs(pasta_base)
-        nome_pasta = f"sessao_zap_{user_id}"
-        profile_path = os.path.join(pasta_base, nome_pasta)
-        options.add_argument(f"user-data-dir={profile_path}")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-gpu")
-
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-        driver.get("https://web.whatsapp.com")
-
-        time.sleep(5)
-        for i in range(30):
-            try:
-                qr_element = driver.find_element(By.CSS_SELECTOR, "canvas")
-                caminho_img = os.path.join('static', f'qrcode_{user_id}.png')
-                qr_element.screenshot(caminho_img)
-            except:
-                pass
-            time.sleep(3)
-    except:
-        pass
-    finally:
-        if driver: driver.quit()
-
-        # --- ROTA: IMPORTAÇÃO DE CSV (Forma Segura) ---
-        @app.route('/importar_csv', methods=['POST'])
-        @login_required
-        def importar_csv():
-            arquivo = request.files.get('arquivo_csv')
-
-            if not arquivo or arquivo.filename == '':
-                flash('Nenhum arquivo selecionado.')
-                return redirect(url_for('index'))
-
-            if not arquivo.filename.endswith('.csv'):
-                flash('Erro: O arquivo deve ser do tipo .CSV')
-                return redirect(url_for('index'))
-
-            try:
-                # Lê o arquivo na memória
-                stream = io.StringIO(arquivo.stream.read().decode("UTF8"), newline=None)
-                csv_input = csv.reader(stream)
-
-                # Pula a primeira linha (cabeçalho: Nome, Telefone)
-                next(csv_input, None)
-
-                count_sucesso = 0
-                count_erro = 0
-
-                for linha in csv_input:
-                    if len(linha) >= 2:
-                        nome = linha[0].strip()
-                        telefone = linha[1].strip()
-
-                        # Limpeza do telefone (apenas números)
-                        telefone_limpo = re.sub(r'\D', '', telefone)
-
-                        # Validação básica: tem que ter pelo menos 10 dígitos (DDD + numero)
-                        if len(telefone_limpo) < 10:
-                            count_erro += 1
-                            continue
-
-                        # Verifica se já existe no banco
-                        if not Cliente.query.filter_by(telefone=telefone_limpo).first():
-                            novo_cliente = Cliente(
-                                nome=nome,
-                                telefone=telefone_limpo,
-                                criado_em=datetime.now().strftime("%d/%m/%Y")
-                            )
-                            db.session.add(novo_cliente)
-                            count_sucesso += 1
-                        else:
-                            count_erro += 1  # Já existia
-
-                db.session.commit()
-                flash(
-                    f'Importação concluída! {count_sucesso} novos contatos salvos. ({count_erro} ignorados/duplicados)')
-
-            except Exception as e:
-                flash(f'Erro ao ler o arquivo: {e}. Verifique se é um CSV válido.')
+def pareamento_orfao(pareamento):
+    return (pareamento.estado not in ESTADOS_FINAIS and pareamento.atualizado_em is not None
+            and pareamento.atualizado_em < datetime.now() - timedelta(seconds=TEMPO_PAREAMENTO_ORFAO))
 
-            return redirect(url_for('index'))
+
+def retrato_pareamento(pareamento):
+    if pareamento is None:
+        return {'estado': 'parado', 'qr': None, 'versao': 0, 'erro': None}
+    retrato = {'estado': pareamento.estado, 'qr': pareamento.qr, 'versao': pareamento.versao,
+               'erro': pareamento.erro}
+    # Ninguém pegou o pedido: o motor de envios não está rodando
+    if pareamento.estado == 'pedido' and pareamento.atualizado_em < datetime.now() - timedelta(
+            seconds=TEMPO_RESPOSTA_MOTOR):
+        retrato.update(estado='erro', erro='O motor de envios não respondeu (python motor_envios.py)')
+    return retrato
+
+
+def aguardar_pareamento(user_id, versao, timeout):
+    # Long-poll no banco: devolve assim que houver algo mais novo que "versao" (ou no fim do timeout)
+    limite = time.monotonic() + timeout
+    while True:
+        pareamento = db.session.query(Pareamento).populate_existing().filter_by(user_id=user_id).first()
+        retrato = retrato_pareamento(pareamento)
+        # Fecha a transação: a próxima leitura enxerga o que o motor gravou depois
+        db.session.rollback()
+        if pareamento is None or retrato['versao'] > versao or retrato['estado'] in ESTADOS_FINAIS \
+                or time.monotonic() >= limite:
+            return retrato
+        time.sleep(INTERVALO_CONSULTA_QR)
+
+
+@app.route('/qrcode/estado')
+@login_required
+def qrcode_estado():
+    # Long-poll: segura a requisição até sair um QR novo ou mudar o estado
+    versao = request.args.get('versao', -1, type=int)
+    return jsonify(aguardar_pareamento(current_user.id, versao, TEMPO_LONG_POLL))
+
+
+@app.route('/qrcode/eventos')
+@login_required
+def qrcode_eventos():
+    # Server-sent events: um evento por QR novo, e o estado final (conectado/expirado/erro) fecha o fluxo
+    user_id = current_user.id
+
+    def gerar():
+        versao = -1
+        while True:
+            retrato = aguardar_pareamento(user_id, versao, TEMPO_LONG_POLL)
+            if retrato['estado'] == 'parado':
+                yield "event: estado\ndata: {\"estado\": \"parado\"}\n\n"
+                return
+            if retrato['versao'] == versao:
+                yield ": ping\n\n"  # Mantém a conexão viva atrás de proxies
+                continue
+            versao = retrato['versao']
+            yield f"event: estado\ndata: {json.dumps(retrato)}\n\n"
+            if retrato['estado'] in ESTADOS_FINAIS:
+                return
+
+    return Response(stream_with_context(gerar()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 # ==========================================
@@ -319,22 +624,29 @@ def agendar_mensagem():
     ids_selecionados = request.form.getlist('destinatarios')
     grupo_manual = request.form.get('grupo_manual')
     mensagem = request.form.get('texto')
-    hora_envio = request.form.get('horario')
+    horario = request.form.get('horario')
     frequencia = request.form.get('frequencia')
     imagem = request.files.get('imagem_upload')
+    modo_texto = request.form.get('modo_texto')
+    if modo_texto not in MODOS_TEXTO:
+        modo_texto = MODO_PADRAO
 
     caminho_absoluto = None
     if imagem and imagem.filename != '':
-        safe_filename = re.sub(r'[^a-zA-Z0-9_.-]', '', imagem.filename)
-        safe_filename = f"{int(time.time())}_{safe_filename}"
-        caminho_final = os.path.join(UPLOAD_FOLDER, safe_filename)
-        imagem.save(caminho_final)
-        caminho_absoluto = os.path.abspath(caminho_final)
-
-    lista_final = []
-    for cliente_id in ids_selecionados:
-        c = db.session.get(Cliente, int(cliente_id))
-        if c: lista_final.append(c.telefone)
+        # Mesma imagem = mesmo arquivo (nome pelo hash do conteúdo), já reduzida para o envio
+        caminho_absoluto = salvar_midia(imagem.stream, imagem.filename)
+
+    # Uma única consulta IN (...) para todos os clientes marcados, mantendo a ordem da seleção
+    if request.form.get('todos_filtro'):
+        # "Selecionar Todos": resolve no servidor todos os clientes do filtro, sem passar pela página
+        lista_final = [t for (t,) in filtrar_clientes(request.form.get('filtro_busca'))
+                       .order_by(Cliente.id.desc()).with_entities(Cliente.telefone)]
+    else:
+        ids_clientes = [int(cliente_id) for cliente_id in ids_selecionados]
+        telefones = {}
+        if ids_clientes:
+            telefones = dict(db.session.query(Cliente.id, Cliente.telefone).filter(Cliente.id.in_(ids_clientes)))
+        lista_final = [telefones[cliente_id] for cliente_id in ids_clientes if cliente_id in telefones]
 
     if grupo_manual:
         grupos = re.split(r'[;,]', grupo_manual)
@@ -345,127 +657,40 @@ def agendar_mensagem():
         flash('Selecione pelo menos um contato ou grupo.')
         return redirect(url_for('index'))
 
-    hora_base, minuto_base = map(int, hora_envio.split(':'))
-    data_base = datetime.now().replace(hour=hora_base, minute=minuto_base, second=0)
-
-    incremento = 0
     usuario_atual_id = current_user.id
-
-    for destino in lista_final:
-        nova_tarefa = Agendamento(
-            user_id=usuario_atual_id, destinatario=destino, mensagem=mensagem,
-            imagem_path=caminho_absoluto, horario=hora_envio, dias_semana=frequencia
-        )
-        db.session.add(nova_tarefa)
-        db.session.commit()
-
-        tempo_ajustado = data_base + timedelta(minutes=incremento * 2)
-
-        if frequencia == 'unica' and tempo_ajustado < datetime.now():
-            tempo_ajustado = datetime.now() + timedelta(seconds=10 + (incremento * 10))
-
-        if frequencia == 'seg-sex':
-            scheduler.add_job(robo_inteligente, 'cron', day_of_week='mon-fri', hour=tempo_ajustado.hour,
-                              minute=tempo_ajustado.minute, args=[nova_tarefa.id])
-        elif frequencia == 'diaria':
-            scheduler.add_job(robo_inteligente, 'cron', hour=tempo_ajustado.hour, minute=tempo_ajustado.minute,
-                              args=[nova_tarefa.id])
-        else:
-            scheduler.add_job(robo_inteligente, 'date', run_date=tempo_ajustado, args=[nova_tarefa.id])
-
-        incremento += 1
+    # O agendamento sai da coluna TIME; o texto "HH:MM" fica só para exibir no painel
+    hora_envio = datetime.strptime(horario, '%H:%M').time()
+    proxima = proxima_execucao(hora_envio, frequencia)
+
+    # Conteúdo e horário uma vez só, na campanha; cada destino é só uma linha enxuta
+    campanha = Campanha(
+        user_id=usuario_atual_id, mensagem=mensagem, imagem_path=caminho_absoluto, horario=horario,
+        dias_semana=frequencia, hora_envio=hora_envio,
+        modo_texto=modo_texto, criado_em=datetime.now()
+    )
+    db.session.add(campanha)
+    db.session.flush()
+
+    linhas = [
+        dict(user_id=usuario_atual_id, campanha_id=campanha.id, destinatario=destino, ativo=True,
+             next_run_at=proxima)
+        for destino in lista_final
+    ]
+    # O motor de envios encontra a campanha nova no banco em alguns segundos
+    inserir_agendamentos(linhas)
 
     flash(f'Agendado para {len(lista_final)} destinos!')
     return redirect(url_for('index'))
 
 
-def robo_inteligente(agendamento_id):
-    with app.app_context():
-        tarefa = db.session.get(Agendamento, agendamento_id)
-        if not tarefa: return
-        executar_selenium(tarefa.destinatario, tarefa.mensagem, tarefa.imagem_path, tarefa.user_id)
-
-
-def executar_selenium(destinatario, texto, caminho_imagem, user_id):
-    driver = None
-    try:
-        options = webdriver.ChromeOptions()
-        dir_path = os.getcwd()
-        pasta_base = os.path.join(dir_path, "sessoes_usuarios")
-        if not os.path.exists(pasta_base): os.makedirs(pasta_base)
-        nome_pasta = f"sessao_zap_{user_id}"
-        profile_path = os.path.join(pasta_base, nome_pasta)
-        options.add_argument(f"user-data-dir={profile_path}")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-gpu")
-
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-
-        apenas_numeros = re.sub(r'\D', '', destinatario)
-        is_telefone = len(apenas_numeros) > 10 and not re.search(r'[a-zA-Z]', destinatario)
-
-        if is_telefone:
-            link = f"https://web.whatsapp.com/send?phone={apenas_numeros}"
-            driver.get(link)
-            wait_time = 60
-        else:
-            driver.get("https://web.whatsapp.com")
-            wait_time = 60
-
-        wait = WebDriverWait(driver, wait_time)
-        try:
-            if is_telefone:
-                caixa_texto = wait.until(EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "#main footer div[contenteditable='true']")
-                ))
-                caixa_texto.click()
-            else:
-                barra = wait.until(EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "div[contenteditable='true'][data-tab='3']")
-                ))
-                barra.click()
-                time.sleep(1)
-                barra.send_keys(destinatario)
-                time.sleep(2)
-                barra.send_keys(Keys.ENTER)
-                time.sleep(3)
-                caixa_texto = driver.find_element(By.CSS_SELECTOR, "#main footer div[contenteditable='true']")
-                caixa_texto.click()
-        except:
-            return
-
-        if texto:
-            for linha in texto.split('\n'):
-                caixa_texto.send_keys(linha)
-                caixa_texto.send_keys(Keys.SHIFT + Keys.ENTER)
-            time.sleep(1)
-            try:
-                driver.find_element(By.CSS_SELECTOR, "span[data-icon='send']").click()
-            except:
-                caixa_texto.send_keys(Keys.ENTER)
-            time.sleep(3)
-
-        if caminho_imagem and os.path.exists(caminho_imagem):
-            try:
-                inputs = driver.find_elements(By.TAG_NAME, "input")
-                anexou = False
-                for inp in inputs:
-                    if "image/" in inp.get_attribute("accept") or "":
-                        inp.send_keys(caminho_imagem)
-                        anexou = True
-                        break
-                if anexou:
-                    time.sleep(10)
-                    ActionChains(driver).send_keys(Keys.ENTER).perform()
-                    time.sleep(5)
-            except:
-                pass
-        time.sleep(3)
-    except:
-        pass
-    finally:
-        if driver: driver.quit()
+def inserir_agendamentos(linhas):
+    # Todas as linhas em um único executemany e um COMMIT só. No MySQL o pymysql junta o executemany em
+    # INSERT ... VALUES (...), (...) de várias linhas; nada de um INSERT por destino nem objetos do ORM.
+    if linhas:
+        db.session.execute(insert(Agendamento), linhas)
+    db.session.commit()
 
 
 if __name__ == '__main__':
+    # Só o painel: os envios e o QR Code ficam com o motor (python motor_envios.py), em outro processo
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,58 @@
+from models import app, db, Agendamento, criar_indices
+from datetime import datetime, time as datetime_time
+from sqlalchemy import text, inspect
+from indice_despacho import proxima_execucao
+
+with app.app_context():
+    print("Atualizando tabela de agendamentos...")
+    try:
+        colunas = {c['name'] for c in inspect(db.engine).get_columns('agendamento')}
+        primeira_vez = 'next_run_at' not in colunas
+
+        with db.engine.connect() as connection:
+            if 'hora_envio' not in colunas:
+                connection.execute(text("ALTER TABLE agendamento ADD COLUMN hora_envio TIME NULL"))
+            if 'next_run_at' not in colunas:
+                connection.execute(text("ALTER TABLE agendamento ADD COLUMN next_run_at DATETIME NULL"))
+            if 'modo_texto' not in colunas:
+                connection.execute(text("ALTER TABLE agendamento ADD COLUMN modo_texto VARCHAR(10) NULL"))
+
+            # Antes desta versão, os envios únicos nunca eram marcados como concluídos. Saem da fila os que já
+            # foram enviados: com tentativa bem-sucedida ou com o horário já passado. A tabela antiga não guarda
+            # a data de criação, mas um único ainda pendente só pode ser de hoje com o horário mais tarde (os de
+            # dias anteriores já rodaram); esses continuam ativos e ganham next_run_at no preenchimento abaixo.
+            if primeira_vez:
+                enviados = "horario IS NULL OR horario <= :agora"
+                if inspect(connection).has_table('tentativa_envio'):
+                    enviados += (" OR EXISTS (SELECT 1 FROM tentativa_envio t WHERE t.agendamento_id = agendamento.id"
+                                 " AND t.resultado = 'enviado')")
+                resultado = connection.execute(
+                    text(f"UPDATE agendamento SET ativo = FALSE WHERE dias_semana = 'unica' AND ({enviados})"),
+                    {'agora': datetime.now().strftime('%H:%M')})
+                print(f"[OK] {resultado.rowcount} envios únicos já enviados marcados como concluídos.")
+
+            # Índice antigo, substituído por (ativo, next_run_at)
+            indices = {i['name'] for i in inspect(connection).get_indexes('agendamento')}
+            if 'ix_agendamento_ativo_dias' in indices:
+                connection.execute(text("DROP INDEX ix_agendamento_ativo_dias ON agendamento"))
+            connection.commit()
+        print("[OK] Colunas hora_envio, next_run_at e modo_texto criadas.")
+
+        criar_indices(Agendamento, 'ix_agendamento_user_id', 'ix_agendamento_ativo_proxima')
+        print("[OK] Índices criados.")
+
+        # Preenchimento em lote: um UPDATE por combinação (horário, frequência), não por linha
+        combinacoes = db.session.query(Agendamento.horario, Agendamento.dias_semana).filter(
+            Agendamento.hora_envio.is_(None), Agendamento.horario.isnot(None)
+        ).distinct().all()
+        for horario, frequencia in combinacoes:
+            hora, minuto = map(int, horario.split(':'))
+            hora_envio = datetime_time(hora, minuto)
+            filtro = (Agendamento.horario == horario, Agendamento.dias_semana == frequencia)
+            Agendamento.query.filter(*filtro).update({'hora_envio': hora_envio}, synchronize_session=False)
+            Agendamento.query.filter(*filtro, Agendamento.ativo == True, Agendamento.next_run_at.is_(None)).update(
+                {'next_run_at': proxima_execucao(hora_envio, frequencia)}, synchronize_session=False)
+        db.session.commit()
+        print(f"[OK] {len(combinacoes)} combinações de horário/frequência preenchidas.")
+    except Exception as e:
+        print(f"[ERRO] Falha ao atualizar: {e}")
@@ -0,0 +1,60 @@
+from datetime import datetime
+from models import app, db, Campanha, Agendamento, criar_indices
+from sqlalchemy import text, inspect
+
+# Cria a tabela campanha e move o conteúdo repetido de cada agendamento (mensagem, imagem, horário,
+# frequência) para uma campanha só, por grupo de linhas iguais. Pode rodar mais de uma vez.
+
+COLUNAS_CONTEUDO = ('user_id', 'mensagem', 'imagem_path', 'horario', 'dias_semana', 'hora_envio', 'modo_texto')
+
+
+def igual(coluna, valor):
+    return coluna.is_(None) if valor is None else coluna == valor
+
+
+with app.app_context():
+    print("Criando campanhas a partir dos agendamentos...")
+    try:
+        Campanha.__table__.create(db.engine, checkfirst=True)
+
+        colunas = {c['name'] for c in inspect(db.engine).get_columns('agendamento')}
+        with db.engine.connect() as connection:
+            if 'campanha_id' not in colunas:
+                connection.execute(text("ALTER TABLE agendamento ADD COLUMN campanha_id INTEGER NULL"))
+                connection.commit()
+        print("[OK] Tabela campanha e coluna agendamento.campanha_id prontas.")
+
+        criar_indices(Campanha, 'ix_campanha_user_id')
+        criar_indices(Agendamento, 'ix_agendamento_campanha_id')
+
+        # Uma campanha por combinação de conteúdo; um UPDATE liga (e esvazia) todas as linhas dela
+        grupos = db.session.query(*[getattr(Agendamento, c) for c in COLUNAS_CONTEUDO]).filter(
+            Agendamento.campanha_id.is_(None)).distinct().all()
+        agora = datetime.now()
+        for grupo in grupos:
+            valores = dict(zip(COLUNAS_CONTEUDO, grupo))
+            campanha = Campanha(criado_em=agora, **valores)
+            # Linhas que não passaram pelo atualiza_agendamento.py: o agendamento sai da coluna TIME
+            if campanha.hora_envio is None and campanha.horario:
+                campanha.hora_envio = datetime.strptime(campanha.horario, '%H:%M').time()
+            db.session.add(campanha)
+            db.session.flush()
+            filtro = [igual(getattr(Agendamento, c), v) for c, v in valores.items()]
+            Agendamento.query.filter(Agendamento.campanha_id.is_(None), *filtro).update({
+                'campanha_id': campanha.id, 'mensagem': None, 'imagem_path': None, 'horario': None,
+                'dias_semana': None, 'hora_envio': None, 'modo_texto': None,
+            }, synchronize_session=False)
+            db.session.commit()
+        print(f"[OK] {len(grupos)} campanhas criadas.")
+
+        # Campanhas criadas antes de o agendamento sair da coluna TIME: preenche hora_envio pelo texto
+        horarios = [h for (h,) in db.session.query(Campanha.horario).filter(
+            Campanha.hora_envio.is_(None), Campanha.horario.isnot(None)).distinct()]
+        for horario in horarios:
+            Campanha.query.filter(Campanha.hora_envio.is_(None), Campanha.horario == horario).update(
+                {'hora_envio': datetime.strptime(horario, '%H:%M').time()}, synchronize_session=False)
+        db.session.commit()
+        print(f"[OK] hora_envio preenchida para {len(horarios)} horários.")
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERRO] Falha ao atualizar: {e}")
@@ -0,0 +1,30 @@
+from models import app, db
+from sqlalchemy import text, inspect, DateTime
+
+# Converte cliente.criado_em de texto (dd/mm/aaaa) para DATETIME (MySQL). Cada passo confere o estado da
+# tabela antes, então pode rodar mais de uma vez (e retomar de onde parou, se cair no meio).
+
+
+def colunas_cliente():
+    return {c['name']: c['type'] for c in inspect(db.engine).get_columns('cliente')}
+
+
+with app.app_context():
+    print("Convertendo cliente.criado_em de texto (dd/mm/aaaa) para DATETIME...")
+    try:
+        colunas = colunas_cliente()
+        if 'criado_em' in colunas and 'criado_em_dt' not in colunas and isinstance(colunas['criado_em'], DateTime):
+            print("[OK] A coluna 'criado_em' já é DATETIME.")
+        else:
+            with db.engine.connect() as connection:
+                if 'criado_em_dt' not in colunas:
+                    connection.execute(text("ALTER TABLE cliente ADD COLUMN criado_em_dt DATETIME NULL"))
+                if 'criado_em' in colunas:
+                    connection.execute(text(
+                        "UPDATE cliente SET criado_em_dt = STR_TO_DATE(criado_em, '%d/%m/%Y') WHERE criado_em_dt IS NULL"))
+                    connection.execute(text("ALTER TABLE cliente DROP COLUMN criado_em"))
+                connection.execute(text("ALTER TABLE cliente CHANGE criado_em_dt criado_em DATETIME NULL"))
+                connection.commit()
+            print("[OK] Coluna 'criado_em' convertida com sucesso!")
+    except Exception as e:
+        print(f"[ERRO] Falha ao converter: {e}")
@@ -0,0 +1,28 @@
+from models import app, db, Agendamento, Pareamento, EstadoMotor, criar_indices
+from sqlalchemy import text, inspect
+
+# Prepara o banco para vários motores de envio: reserva por destino em agendamento,
+# perfis anunciados por motor e as tabelas de pareamento e estado dos motores. Pode rodar mais de uma vez.
+
+with app.app_context():
+    print("Atualizando a fila de envios...")
+    try:
+        Pareamento.__table__.create(db.engine, checkfirst=True)
+        EstadoMotor.__table__.create(db.engine, checkfirst=True)
+
+        colunas = {c['name'] for c in inspect(db.engine).get_columns('agendamento')}
+        colunas_motor = {c['name'] for c in inspect(db.engine).get_columns('estado_motor')}
+        with db.engine.connect() as connection:
+            if 'reservado_por' not in colunas:
+                connection.execute(text("ALTER TABLE agendamento ADD COLUMN reservado_por VARCHAR(100) NULL"))
+            if 'reservado_ate' not in colunas:
+                connection.execute(text("ALTER TABLE agendamento ADD COLUMN reservado_ate DATETIME NULL"))
+            if 'perfis' not in colunas_motor:
+                connection.execute(text("ALTER TABLE estado_motor ADD COLUMN perfis TEXT NULL"))
+            connection.commit()
+        print("[OK] Colunas reservado_por, reservado_ate e estado_motor.perfis criadas.")
+
+        criar_indices(Agendamento, 'ix_agendamento_reservado_por')
+        print("[OK] Índices criados.")
+    except Exception as e:
+        print(f"[ERRO] Falha ao atualizar: {e}")
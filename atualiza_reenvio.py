@@ -0,0 +1,23 @@
+from models import app, db, Agendamento, criar_indices
+from sqlalchemy import text, inspect
+
+# Colunas das novas tentativas e da lista de falhas em agendamento. Pode rodar mais de uma vez.
+
+with app.app_context():
+    print("Atualizando tabela de agendamentos (novas tentativas)...")
+    try:
+        colunas = {c['name'] for c in inspect(db.engine).get_columns('agendamento')}
+        with db.engine.connect() as connection:
+            if 'tentativas' not in colunas:
+                connection.execute(text("ALTER TABLE agendamento ADD COLUMN tentativas INTEGER DEFAULT 0"))
+            if 'falhou_em' not in colunas:
+                connection.execute(text("ALTER TABLE agendamento ADD COLUMN falhou_em DATETIME NULL"))
+            if 'erro_final' not in colunas:
+                connection.execute(text("ALTER TABLE agendamento ADD COLUMN erro_final VARCHAR(255) NULL"))
+            connection.commit()
+        print("[OK] Colunas tentativas, falhou_em e erro_final criadas.")
+
+        criar_indices(Agendamento, 'ix_agendamento_falhas')
+        print("[OK] Índices criados.")
+    except Exception as e:
+        print(f"[ERRO] Falha ao atualizar: {e}")
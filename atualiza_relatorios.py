@@ -0,0 +1,42 @@
+from datetime import date
+from models import app, db, Agendamento, TentativaEnvio, ContadorDiario
+
+# Cria a tabela contador_diario e preenche com o histórico que já existe (tentativa_envio e lista de falhas).
+# Pode rodar mais de uma vez: o preenchimento só acontece com a tabela vazia.
+
+
+def como_data(valor):
+    # DATE() volta como texto no SQLite e como date no MySQL
+    return date.fromisoformat(valor) if isinstance(valor, str) else valor
+
+
+with app.app_context():
+    print("Criando contadores diários dos relatórios...")
+    try:
+        ContadorDiario.__table__.create(db.engine, checkfirst=True)
+        print("[OK] Tabela contador_diario criada.")
+
+        if db.session.query(ContadorDiario.user_id).first() is None:
+            contadores = {}
+            dia = db.func.date(TentativaEnvio.inicio)
+            enviados = db.func.sum(db.case((TentativaEnvio.resultado == 'enviado', 1), else_=0))
+            falhas = db.func.sum(db.case((TentativaEnvio.resultado == 'falha', 1), else_=0))
+            for user_id, d, e, f in db.session.query(TentativaEnvio.user_id, dia, enviados, falhas).filter(
+                    TentativaEnvio.user_id.isnot(None)).group_by(TentativaEnvio.user_id, dia):
+                contadores[(user_id, como_data(d))] = ContadorDiario(
+                    user_id=user_id, dia=como_data(d), enviados=int(e or 0), falhas=int(f or 0), descartados=0)
+
+            dia = db.func.date(Agendamento.falhou_em)
+            for user_id, d, n in db.session.query(Agendamento.user_id, dia, db.func.count(Agendamento.id)).filter(
+                    Agendamento.falhou_em.isnot(None), Agendamento.user_id.isnot(None)).group_by(Agendamento.user_id, dia):
+                contador = contadores.setdefault((user_id, como_data(d)), ContadorDiario(
+                    user_id=user_id, dia=como_data(d), enviados=0, falhas=0, descartados=0))
+                contador.descartados = n
+
+            db.session.add_all(contadores.values())
+            db.session.commit()
+            print(f"[OK] {len(contadores)} contadores preenchidos com o histórico.")
+        else:
+            print("[OK] Contadores já preenchidos.")
+    except Exception as e:
+        print(f"[ERRO] Falha ao atualizar: {e}")
@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import tempfile
+from datetime import datetime
+
+# Benchmark de ponta a ponta contra o whatsapp_falso.py: /agendar -> motor de envios -> despachante -> Chrome.
+# Mede mensagens por minuto, latência de cada fase (p50/p95) e memória por navegador.
+#
+# Uso:  python benchmark.py --mensagens 200 --usuarios 4
+#       python benchmark.py --mensagens 50 --imagem --falha-envio 0.05 --json resultado.json
+#       python benchmark.py --mensagens 50 --imagem --sem-legenda   (texto e imagem em duas mensagens)
+#       python benchmark.py --mensagens 200 --usuarios 4 --motores 2   (motores extras em outros processos)
+#
+# Roda numa pasta temporária (banco SQLite, uploads e perfis do Chrome próprios): não mexe nos dados reais.
+# Precisa do Chrome e do chromedriver (TIMESEND_CHROMEDRIVER ajuda sem internet). psutil é opcional (memória,
+# medida só nos navegadores do motor deste processo).
+
+PASTA_PROJETO = os.path.dirname(os.path.abspath(__file__))
+
+
+def ler_argumentos():
+    parser = argparse.ArgumentParser(description="Benchmark de envios do TimeSend contra o WhatsApp falso")
+    parser.add_argument('--mensagens', type=int, default=100, help="Total de envios (somando todos os usuários)")
+    parser.add_argument('--usuarios', type=int, default=2, help="Contas de WhatsApp enviando em paralelo")
+    parser.add_argument('--grupos', action='store_true', help="Envia para grupos (busca) em vez de telefones")
+    parser.add_argument('--imagem', action='store_true', help="Anexa uma imagem em cada envio")
+    parser.add_argument('--sem-legenda', action='store_true',
+                        help="Com --imagem, manda texto e imagem como duas mensagens (modo antigo)")
+    parser.add_argument('--motores', type=int, default=1,
+                        help="Motores de envio disputando a mesma fila (os extras rodam em outros processos)")
+    parser.add_argument('--perfil', default='leve', choices=('leve', 'completo'), help="Perfil do Chrome")
+    parser.add_argument('--porta', type=int, default=8099, help="Porta do WhatsApp falso")
+    parser.add_argument('--latencia-pagina', type=int, default=300)
+    parser.add_argument('--latencia-conversa', type=int, default=200)
+    parser.add_argument('--latencia-envio', type=int, default=300)
+    parser.add_argument('--falha-conversa', type=float, default=0)
+    parser.add_argument('--falha-envio', type=float, default=0)
+    parser.add_argument('--tempo-maximo', type=int, default=1800, help="Segundos até desistir de esperar")
+    parser.add_argument('--pasta', help="Pasta de trabalho (padrão: uma pasta temporária nova)")
+    parser.add_argument('--json', help="Grava o resultado neste arquivo (para comparar entre versões no CI)")
+    return parser.parse_args()
+
+
+def preparar_ambiente(args):
+    pasta = os.path.abspath(args.pasta or tempfile.mkdtemp(prefix='timesend_benchmark_'))
+    os.makedirs(pasta, exist_ok=True)
+    os.environ['TIMESEND_DATABASE_URI'] = 'sqlite:///' + os.path.join(pasta, 'benchmark.db')
+    os.environ['TIMESEND_WHATSAPP_URL'] = f'http://127.0.0.1:{args.porta}'
+    os.environ['TIMESEND_PERFIL_NAVEGADOR'] = args.perfil
+    # Sem ritmo anti-bloqueio: o que interessa aqui é o custo do robô em si
+    os.environ.setdefault('TIMESEND_INTERVALO_ENVIO', '0')
+    os.environ.setdefault('TIMESEND_LIMITE_RAJADA', '1000000')
+    # Falhas injetadas não podem segurar o benchmark por um minuto cada
+    os.environ.setdefault('TIMESEND_TEMPO_CONVERSA', '15')
+    os.environ.setdefault('TIMESEND_TEMPO_BOLHA', '10')
+    if args.sem_legenda:
+        os.environ['TIMESEND_IMAGEM_COM_LEGENDA'] = '0'
+    # O motor acha as campanhas novas no banco logo depois do /agendar
+    os.environ.setdefault('TIMESEND_INTERVALO_BUSCA', '1')
+    # Perfis do Chrome, uploads e banco ficam na pasta de trabalho
+    os.chdir(pasta)
+    sys.path.insert(0, PASTA_PROJETO)
+    return pasta
+
+
+def criar_imagem(pasta):
+    # PNG 1x1 válido, sem depender do Pillow
+    caminho = os.path.join(pasta, 'benchmark.png')
+    with open(caminho, 'wb') as arq:
+        arq.write(bytes.fromhex(
+            '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+            '1f15c4890000000d49444154789c6360f8cfc0000003010100c9fe92ef0000000049454e44ae426082'))
+    return caminho
+
+
+def memoria_navegadores(servico):
+    # RSS de cada Chrome aberto pelo chromedriver, somando os processos filhos (renderizador, GPU...)
+    try:
+        import psutil
+    except ImportError:
+        return None
+    if servico is None or servico.process is None:
+        return {}
+    try:
+        driver = psutil.Process(servico.process.pid)
+        memoria = {}
+        for navegador in driver.children():
+            processos = [navegador] + navegador.children(recursive=True)
+            memoria[navegador.pid] = sum(p.memory_info().rss for p in processos if p.is_running())
+        return memoria
+    except psutil.Error:
+        return {}
+
+
+def subir_motores_extras(pasta, quantidade, ids_usuarios):
+    # Cada motor extra roda na própria pasta e hospeda uma parte dos perfis (sessao_zap_{id});
+    # o motor deste processo fica com o resto. Todos disputam a mesma fila no banco.
+    processos = []
+    for n in range(1, quantidade):
+        pasta_motor = os.path.join(pasta, f'motor_{n}')
+        for user_id in ids_usuarios[n::quantidade]:
+            os.makedirs(os.path.join(pasta_motor, 'sessoes_usuarios', f'sessao_zap_{user_id}'), exist_ok=True)
+        processos.append(subprocess.Popen([sys.executable, os.path.join(PASTA_PROJETO, 'motor_envios.py')],
+                                          cwd=pasta_motor))
+    return processos
+
+
+def main():
+    args = ler_argumentos()
+    pasta = preparar_ambiente(args)
+
+    import whatsapp_falso
+    import pool_navegadores
+    from models import app as app_flask, db, User, Cliente, TentativaEnvio
+    from metricas import resumir_tentativas
+    from werkzeug.security import generate_password_hash
+
+    # Banco novo antes de subir o motor (ele prepara a fila na subida)
+    with app_flask.app_context():
+        db.drop_all()
+        db.create_all()
+    import app as servidor
+    import motor_envios
+    agendador = motor_envios.iniciar()
+
+    falso = whatsapp_falso.iniciar_em_thread(args.porta, {
+        'latencia_pagina': args.latencia_pagina, 'latencia_conversa': args.latencia_conversa,
+        'latencia_envio': args.latencia_envio, 'falha_conversa': args.falha_conversa,
+        'falha_envio': args.falha_envio,
+    })
+
+    por_usuario = max(1, args.mensagens // args.usuarios)
+    with servidor.app.app_context():
+        for u in range(args.usuarios):
+            db.session.add(User(username=f'bench{u}', password=generate_password_hash('bench'), is_admin=False))
+        db.session.add_all([Cliente(nome=f'Cliente {i}', telefone=f'55119{i:08d}', criado_em=datetime.now())
+                            for i in range(por_usuario)])
+        db.session.commit()
+        ids_clientes = [str(c.id) for c in Cliente.query.order_by(Cliente.id)]
+        ids_usuarios = [u.id for u in User.query.order_by(User.id)]
+
+    # Perfis que o motor deste processo hospeda (ele só pega envios desses usuários)
+    for user_id in ids_usuarios[::max(1, args.motores)]:
+        os.makedirs(pool_navegadores.caminho_perfil(user_id), exist_ok=True)
+    motores_extras = subir_motores_extras(pasta, args.motores, ids_usuarios)
+
+    imagem = criar_imagem(pasta) if args.imagem else None
+    total = por_usuario * args.usuarios
+    print(f"[INFO] {total} envios, {args.usuarios} usuários, {args.motores} motores, perfil {args.perfil}, "
+          f"pasta {pasta}")
+
+    inicio = time.perf_counter()
+    for u in range(args.usuarios):
+        cliente_http = servidor.app.test_client()
+        cliente_http.post('/login', data={'username': f'bench{u}', 'password': 'bench'})
+        dados = {'texto': 'Olá {primeiro_nome}, mensagem de benchmark.', 'horario': datetime.now().strftime('%H:%M'),
+                 'frequencia': 'unica', 'modo_texto': 'colar'}
+        if args.grupos:
+            dados['grupo_manual'] = ','.join(f'Grupo {u}-{i}' for i in range(por_usuario))
+        else:
+            dados['destinatarios'] = ids_clientes
+        if imagem:
+            dados['imagem_upload'] = (open(imagem, 'rb'), 'benchmark.png')
+        cliente_http.post('/agendar', data=dados, content_type='multipart/form-data')
+
+    # Espera todas as tentativas (enviadas ou falhas) serem registradas, medindo a memória no caminho
+    pico_memoria = {}
+    feitas = 0
+    while time.perf_counter() - inicio < args.tempo_maximo:
+        with servidor.app.app_context():
+            feitas = db.session.query(TentativaEnvio).count()
+        for pid, rss in (memoria_navegadores(pool_navegadores._servico) or {}).items():
+            pico_memoria[pid] = max(pico_memoria.get(pid, 0), rss)
+        if feitas >= total:
+            break
+        time.sleep(1)
+    duracao = time.perf_counter() - inicio
+
+    with servidor.app.app_context():
+        tentativas = db.session.query(TentativaEnvio).all()
+        resumo = resumir_tentativas(tentativas, duracao / 60)
+    entregues = len(falso.app.mensagens)
+    motor_envios.encerrar(agendador)
+    for processo in motores_extras:
+        processo.terminate()
+    falso.shutdown()
+
+    resumo['duracao_s'] = round(duracao, 1)
+    resumo['esperados'] = total
+    resumo['entregues_no_falso'] = entregues
+    resumo['memoria_mb_por_navegador'] = (
+        round(sum(pico_memoria.values()) / len(pico_memoria) / 1048576, 1) if pico_memoria else None)
+    resumo['navegadores'] = len(pico_memoria) or None
+    resumo['parametros'] = vars(args)
+
+    print(f"[OK] {resumo['enviados']}/{total} enviados em {resumo['duracao_s']} s "
+          f"({resumo['mensagens_por_minuto']} msg/min), {resumo['falhas']} falhas, "
+          f"{entregues} mensagens no WhatsApp falso")
+    for fase, valores in resumo['fases'].items():
+        if valores['amostras']:
+            print(f"     {fase:<10} p50 {valores['p50']:.3f} s   p95 {valores['p95']:.3f} s   ({valores['amostras']})")
+    if resumo['memoria_mb_por_navegador']:
+        print(f"     memória: {resumo['memoria_mb_por_navegador']} MB por navegador ({resumo['navegadores']} navegadores)")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arq:
+            json.dump(resumo, arq, indent=2, ensure_ascii=False, default=str)
+    return 0 if feitas >= total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
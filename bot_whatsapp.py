@@ -1,3 +1,4 @@
+import os
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -7,5 +8,5 @@ options.add_argument("--remote-debugging-port=9222")
 options.add_argument("--disable-dev-shm-usage")
 options.add_argument("--no-sandbox")
 
-service = Service(r"C:\WebDriver\chromedriver.exe")
+service = Service(os.environ.get('TIMESEND_CHROMEDRIVER', r"C:\WebDriver\chromedriver.exe"))
 driver = webdriver.Chrome(service=service, options=options)
@@ -0,0 +1,100 @@
+import os
+import sys
+import shutil
+import socket
+
+from pool_navegadores import PASTA_SESSOES
+
+# Compacta as pastas de sessão do Chrome (sessoes_usuarios/sessao_zap_<id>) sem desconectar o WhatsApp.
+# Só apaga caches que o navegador recria sozinho; o login fica em IndexedDB e Local Storage, que são mantidos.
+#
+# Uso:  python compacta_perfis.py          -> todas as sessões
+#       python compacta_perfis.py 1 7      -> só as sessões dos usuários 1 e 7
+#
+# Rode com o navegador do perfil fechado (o pool fecha sozinho depois de TIMESEND_TEMPO_OCIOSO).
+
+PASTAS_DESCARTAVEIS = (
+    'Cache',
+    'Code Cache',
+    'GPUCache',
+    'DawnCache',
+    'DawnGraphiteCache',
+    'DawnWebGPUCache',
+    os.path.join('Service Worker', 'CacheStorage'),
+    os.path.join('Service Worker', 'ScriptCache'),
+    'blob_storage',
+    'Download Service',
+    'optimization_guide_hint_cache_store',
+)
+# Pastas na raiz do perfil (fora de "Default")
+PASTAS_DESCARTAVEIS_RAIZ = (
+    'GrShaderCache',
+    'GraphiteDawnCache',
+    'ShaderCache',
+    'Crashpad',
+    'BrowserMetrics',
+    'component_crx_cache',
+    'optimization_guide_model_store',
+    'Safe Browsing',
+)
+
+
+def tamanho(caminho):
+    total = 0
+    for raiz, _, arquivos in os.walk(caminho):
+        for nome in arquivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, nome))
+            except OSError:
+                pass
+    return total
+
+
+def perfil_em_uso(pasta_perfil):
+    # O Chrome deixa o link SingletonLock ("<máquina>-<pid>") enquanto o perfil está aberto
+    trava = os.path.join(pasta_perfil, 'SingletonLock')
+    if not os.path.lexists(trava):
+        return os.path.exists(os.path.join(pasta_perfil, 'lockfile'))  # Windows
+    try:
+        maquina, pid = os.readlink(trava).rsplit('-', 1)
+        if maquina != socket.gethostname():
+            return True
+        os.kill(int(pid), 0)
+        return True
+    except ProcessLookupError:
+        return False  # Sobrou de um Chrome que caiu
+    except (OSError, ValueError):
+        return True
+
+
+def compactar_perfil(pasta_perfil):
+    alvos = [os.path.join(pasta_perfil, 'Default', p) for p in PASTAS_DESCARTAVEIS]
+    alvos += [os.path.join(pasta_perfil, p) for p in PASTAS_DESCARTAVEIS_RAIZ]
+    liberado = 0
+    for alvo in alvos:
+        if os.path.isdir(alvo):
+            liberado += tamanho(alvo)
+            shutil.rmtree(alvo, ignore_errors=True)
+    return liberado
+
+
+if __name__ == '__main__':
+    if not os.path.isdir(PASTA_SESSOES):
+        print(f"[INFO] Nenhuma sessão em {PASTA_SESSOES}")
+        sys.exit(0)
+
+    escolhidos = {f"sessao_zap_{uid}" for uid in sys.argv[1:]}
+    total = 0
+    for nome in sorted(os.listdir(PASTA_SESSOES)):
+        pasta = os.path.join(PASTA_SESSOES, nome)
+        if not os.path.isdir(pasta) or (escolhidos and nome not in escolhidos):
+            continue
+        if perfil_em_uso(pasta):
+            print(f"[INFO] {nome}: navegador aberto, pulando.")
+            continue
+        antes = tamanho(pasta)
+        liberado = compactar_perfil(pasta)
+        total += liberado
+        print(f"[OK] {nome}: {antes / 1048576:.1f} MB -> {(antes - liberado) / 1048576:.1f} MB")
+
+    print(f"[OK] Total liberado: {total / 1048576:.1f} MB")
@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict, deque
+
+
+class Despachante:
+    # Distribui os envios entre um número fixo de workers:
+    #   - no máximo UM envio ativo por perfil de WhatsApp (user_id)
+    #   - no máximo `max_workers` envios (navegadores) ativos no total
+    #   - usuários diferentes são atendidos em rodízio, em paralelo
+    def __init__(self, max_workers):
+        self.max_workers = max(1, max_workers)
+        self._filas = OrderedDict()  # user_id -> deque de (func, args)
+        self._ativos = set()         # user_ids com envio em andamento
+        self._cond = threading.Condition()
+        self._workers = []
+
+    def enviar(self, user_id, func, *args):
+        with self._cond:
+            self._filas.setdefault(user_id, deque()).append((func, args))
+            if len(self._workers) < self.max_workers:
+                t = threading.Thread(target=self._worker, daemon=True, name=f"despachante-{len(self._workers)}")
+                self._workers.append(t)
+                t.start()
+            self._cond.notify()
+
+    def _proximo(self):
+        # Primeiro usuário da fila que não está com envio ativo; depois vai para o fim (rodízio)
+        for user_id, fila in self._filas.items():
+            if user_id not in self._ativos:
+                func, args = fila.popleft()
+                if fila:
+                    self._filas.move_to_end(user_id)
+                else:
+                    del self._filas[user_id]
+                self._ativos.add(user_id)
+                return user_id, func, args
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                item = self._proximo()
+                while item is None:
+                    self._cond.wait()
+                    item = self._proximo()
+            user_id, func, args = item
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"[ERRO] Envio do usuário {user_id} falhou: {e}")
+            finally:
+                with self._cond:
+                    self._ativos.discard(user_id)
+                    self._cond.notify_all()
@@ -0,0 +1,40 @@
+from selenium.webdriver.common.keys import Keys
+
+from models import MODO_PADRAO
+
+# Como o texto entra na caixa de mensagem (MODOS_TEXTO):
+#   colar   -> um único evento de "colar" com o texto inteiro (rápido, mantém quebras de linha e emojis)
+#   digitar -> tecla a tecla, uma linha por vez (modo antigo, mais "humano")
+
+# Dispara um "paste" com o texto na área editável. Se a página não tratar o evento,
+# insere o texto com insertText, que também preserva as quebras de linha.
+SCRIPT_COLAR = """
+const alvo = arguments[0], texto = arguments[1];
+alvo.focus();
+const dados = new DataTransfer();
+dados.setData('text/plain', texto);
+const evento = new ClipboardEvent('paste', {clipboardData: dados, bubbles: true, cancelable: true});
+if (alvo.dispatchEvent(evento)) {
+    document.execCommand('insertText', false, texto);
+}
+return alvo.innerText;
+"""
+
+
+def digitar_texto(caixa_texto, texto):
+    for linha in texto.split('\n'):
+        caixa_texto.send_keys(linha)
+        caixa_texto.send_keys(Keys.SHIFT + Keys.ENTER)
+
+
+def colar_texto(driver, caixa_texto, texto):
+    conteudo = driver.execute_script(SCRIPT_COLAR, caixa_texto, texto)
+    return bool(conteudo and conteudo.strip())
+
+
+def inserir_texto(driver, caixa_texto, texto, modo=None):
+    if (modo or MODO_PADRAO) == 'colar' and colar_texto(driver, caixa_texto, texto):
+        return 'colar'
+    # Modo digitar, ou a página não aceitou o texto colado
+    digitar_texto(caixa_texto, texto)
+    return 'digitar'
@@ -0,0 +1,102 @@
+import csv
+import re
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Cliente
+
+# Quantas linhas do CSV são validadas, conferidas no banco e gravadas de uma vez
+TAMANHO_LOTE = 1000
+
+
+def normalizar_telefone(telefone):
+    return re.sub(r'\D', '', telefone or '')
+
+
+def novo_progresso():
+    return {'status': 'processando', 'linhas': 0, 'novos': 0, 'duplicados': 0, 'rejeitados': 0, 'erro': None}
+
+
+def ler_lotes(arquivo_texto):
+    # Aceita vírgula (padrão) ou ponto e vírgula (Excel em português)
+    amostra = arquivo_texto.read(4096)
+    arquivo_texto.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=',;')
+    except csv.Error:
+        dialeto = csv.excel
+
+    leitor = csv.reader(arquivo_texto, dialeto)
+    # Pula a primeira linha (cabeçalho: Nome, Telefone)
+    next(leitor, None)
+
+    lote = []
+    for linha in leitor:
+        lote.append((leitor.line_num, linha))
+        if len(lote) >= TAMANHO_LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def gravar_lote(novos):
+    # Deduplicação contra o banco: uma consulta IN (...) por lote
+    existentes = {t for (t,) in db.session.query(Cliente.telefone).filter(Cliente.telefone.in_(list(novos)))}
+    agora = datetime.now()
+    linhas = [
+        {'nome': nome, 'telefone': telefone, 'criado_em': agora}
+        for telefone, nome in novos.items() if telefone not in existentes
+    ]
+    if linhas:
+        db.session.execute(insert(Cliente), linhas)
+    db.session.commit()
+    return len(linhas)
+
+
+def importar_clientes(caminho_csv, progresso, caminho_rejeitados, ao_lote=None):
+    # Memória constante: só um lote fica carregado por vez. Os duplicados dentro do próprio
+    # arquivo são pegos no lote (set) ou pela consulta ao banco dos lotes seguintes.
+    with open(caminho_csv, encoding='utf-8-sig', newline='') as arquivo_texto, \
+            open(caminho_rejeitados, 'w', encoding='utf-8', newline='') as arquivo_rejeitados:
+        rejeitados = csv.writer(arquivo_rejeitados)
+        rejeitados.writerow(['linha', 'motivo', 'conteudo'])
+
+        for lote in ler_lotes(arquivo_texto):
+            novos = {}  # telefone -> nome
+            for num_linha, linha in lote:
+                if len(linha) < 2:
+                    rejeitados.writerow([num_linha, 'colunas insuficientes', ';'.join(linha)])
+                    progresso['rejeitados'] += 1
+                    continue
+
+                nome = linha[0].strip()
+                telefone_limpo = normalizar_telefone(linha[1])
+
+                # Validação básica: pelo menos 10 dígitos (DDD + numero) e no máximo os 20 de cliente.telefone
+                if len(telefone_limpo) < 10 or len(telefone_limpo) > 20:
+                    rejeitados.writerow([num_linha, 'telefone inválido', ';'.join(linha)])
+                    progresso['rejeitados'] += 1
+                elif not nome:
+                    rejeitados.writerow([num_linha, 'nome vazio', ';'.join(linha)])
+                    progresso['rejeitados'] += 1
+                elif telefone_limpo in novos:
+                    progresso['duplicados'] += 1
+                else:
+                    novos[telefone_limpo] = nome[:100]
+
+            if novos:
+                try:
+                    gravados = gravar_lote(novos)
+                except IntegrityError:
+                    # Alguém cadastrou um desses telefones no meio do caminho: confere de novo
+                    db.session.rollback()
+                    gravados = gravar_lote(novos)
+                progresso['novos'] += gravados
+                progresso['duplicados'] += len(novos) - gravados
+
+            progresso['linhas'] += len(lote)
+            if ao_lote:
+                ao_lote(progresso)
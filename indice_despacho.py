@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta
+
+# A fila de envios é a própria tabela agendamento: cada destino guarda a próxima execução (next_run_at)
+# e os motores de envio reservam os que venceram (veja motor_envios.py).
+
+
+def proxima_execucao(hora_envio, frequencia, agora=None):
+    # hora_envio é a coluna TIME da campanha. Mesma semântica que os jobs do APScheduler tinham:
+    #   unica   -> hoje no horário, ou imediatamente se o horário já passou
+    #   diaria  -> próxima ocorrência do horário (hoje ou amanhã)
+    #   seg-sex -> próxima ocorrência do horário em dia útil
+    agora = agora or datetime.now()
+    quando = agora.replace(hour=hora_envio.hour, minute=hora_envio.minute, second=0, microsecond=0)
+
+    if frequencia == 'unica':
+        return max(quando, agora)
+
+    if quando < agora:
+        quando += timedelta(days=1)
+    if frequencia == 'seg-sex':
+        while quando.weekday() >= 5:
+            quando += timedelta(days=1)
+    return quando
@@ -0,0 +1,138 @@
+import os
+import random
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+# --- LIMITES DE ENVIO POR CONTA DE WHATSAPP ---
+# Valem para a conta inteira (todas as campanhas do usuário juntas), não para cada campanha.
+INTERVALO_ENVIO = int(os.environ.get('TIMESEND_INTERVALO_ENVIO', 120))       # Segundos para ganhar uma "ficha"
+VARIACAO_INTERVALO = int(os.environ.get('TIMESEND_VARIACAO_INTERVALO', 0))   # Até N segundos a mais, sorteados
+RAJADA = int(os.environ.get('TIMESEND_LIMITE_RAJADA', 1))                    # Envios seguidos sem esperar
+LIMITE_HORA = int(os.environ.get('TIMESEND_LIMITE_HORA', 0))                 # 0 = sem limite
+LIMITE_DIA = int(os.environ.get('TIMESEND_LIMITE_DIA', 0))                   # 0 = sem limite
+# Horários permitidos, ex.: "08:00-12:00,13:30-20:00" (vazio = o dia todo; "22:00-06:00" atravessa a meia-noite)
+JANELAS_ENVIO = os.environ.get('TIMESEND_JANELAS_ENVIO', '')
+
+
+def ler_janelas(texto):
+    # "08:00-12:00,13:30-20:00" -> [(480, 720), (810, 1200)] em minutos do dia
+    janelas = []
+    for trecho in (texto or '').split(','):
+        if '-' not in trecho:
+            continue
+        inicio, fim = (t.strip() for t in trecho.split('-', 1))
+        h1, m1 = map(int, inicio.split(':'))
+        h2, m2 = map(int, fim.split(':'))
+        inicio, fim = h1 * 60 + m1, h2 * 60 + m2
+        if inicio < fim:
+            janelas.append((inicio, fim))
+        elif inicio > fim:
+            # Atravessa a meia-noite: vira dois pedaços
+            janelas.append((inicio, 24 * 60))
+            janelas.append((0, fim))
+    return sorted(janelas)
+
+
+def proxima_abertura(quando, janelas):
+    # O próprio "quando", se estiver dentro de uma janela; senão, o início da próxima janela
+    if not janelas:
+        return quando
+    meia_noite = quando.replace(hour=0, minute=0, second=0, microsecond=0)
+    for dia in range(2):
+        base = meia_noite + timedelta(days=dia)
+        for inicio, fim in janelas:
+            abre = base + timedelta(minutes=inicio)
+            fecha = base + timedelta(minutes=fim)
+            if quando < fecha:
+                return max(quando, abre)
+    return quando
+
+
+class EstadoConta:
+    def __init__(self, rajada, agora):
+        self.fichas = float(rajada)
+        self.atualizado = agora
+        self.envios = deque()  # Horários dos envios das últimas 24 h, em ordem
+        self.atraso = 0.0      # Variação sorteada no último envio
+
+
+class LimitadorEnvios:
+    # Balde de fichas por conta: ganha uma ficha a cada `intervalo` segundos, até `rajada` fichas.
+    # Por cima dele, tetos por hora e por dia (janela deslizante) e os horários permitidos.
+    # O despachante já garante um envio por vez por conta, então reservar e consumir não disputam entre si.
+    def __init__(self, intervalo=INTERVALO_ENVIO, rajada=RAJADA, limite_hora=LIMITE_HORA, limite_dia=LIMITE_DIA,
+                 janelas=JANELAS_ENVIO, variacao=VARIACAO_INTERVALO, historico=None):
+        self.intervalo = max(0, intervalo)
+        self.rajada = max(1, rajada)
+        self.limite_hora = limite_hora
+        self.limite_dia = limite_dia
+        self.janelas = ler_janelas(janelas) if isinstance(janelas, str) else janelas
+        self.variacao = variacao
+        self.historico = historico  # user_id -> horários dos envios das últimas 24 h (para sobreviver a reinícios)
+        self._contas = {}
+        self._lock = threading.Lock()
+
+    def _conta(self, user_id, agora):
+        conta = self._contas.get(user_id)
+        if conta is None:
+            conta = EstadoConta(self.rajada, agora)
+            if self.historico:
+                try:
+                    conta.envios.extend(sorted(self.historico(user_id)))
+                except Exception as e:
+                    print(f"[AVISO] Histórico de envios do usuário {user_id} indisponível: {e}")
+            self._contas[user_id] = conta
+        # Repõe as fichas pelo tempo passado e esquece o que saiu da janela de 24 h
+        if self.intervalo:
+            ganho = (agora - conta.atualizado).total_seconds() / self.intervalo
+            conta.fichas = min(float(self.rajada), conta.fichas + max(0.0, ganho))
+        else:
+            conta.fichas = float(self.rajada)
+        conta.atualizado = max(conta.atualizado, agora)
+        while conta.envios and conta.envios[0] <= agora - timedelta(days=1):
+            conta.envios.popleft()
+        return conta
+
+    def _liberacao(self, conta, agora):
+        quando = agora
+        if conta.fichas < 1:
+            espera = (1 - conta.fichas) * self.intervalo + conta.atraso
+            quando = max(quando, conta.atualizado + timedelta(seconds=espera))
+        if self.limite_hora:
+            ultima_hora = [t for t in conta.envios if t > agora - timedelta(hours=1)]
+            if len(ultima_hora) >= self.limite_hora:
+                quando = max(quando, ultima_hora[-self.limite_hora] + timedelta(hours=1))
+        if self.limite_dia and len(conta.envios) >= self.limite_dia:
+            quando = max(quando, conta.envios[-self.limite_dia] + timedelta(days=1))
+        return proxima_abertura(quando, self.janelas)
+
+    def proxima_liberacao(self, user_id, agora=None):
+        agora = agora or datetime.now()
+        with self._lock:
+            return self._liberacao(self._conta(user_id, agora), agora)
+
+    def consumir(self, user_id, agora=None):
+        agora = agora or datetime.now()
+        with self._lock:
+            conta = self._conta(user_id, agora)
+            conta.fichas -= 1
+            conta.envios.append(agora)
+            conta.atraso = random.uniform(0, self.variacao) if self.variacao else 0.0
+
+    def usuarios(self):
+        with self._lock:
+            return set(self._contas)
+
+    def situacao(self, user_id, agora=None):
+        agora = agora or datetime.now()
+        with self._lock:
+            conta = self._conta(user_id, agora)
+            return {
+                'proxima_liberacao': self._liberacao(conta, agora).isoformat(timespec='seconds'),
+                'fichas': round(conta.fichas, 2),
+                'enviados_hora': sum(1 for t in conta.envios if t > agora - timedelta(hours=1)),
+                'enviados_dia': len(conta.envios),
+                'limite_hora': self.limite_hora or None,
+                'limite_dia': self.limite_dia or None,
+            }
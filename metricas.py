@@ -0,0 +1,80 @@
+import os
+import math
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Fases de um envio, na ordem em que acontecem
+FASES = ('navegador', 'pagina', 'conversa', 'texto', 'midia', 'envio')
+
+# Quantas tentativas (as mais recentes da janela) entram no p50/p95 do /api/metricas. As contagens
+# vêm agrupadas do banco; só a amostra dos tempos é carregada.
+AMOSTRA_FASES = int(os.environ.get('TIMESEND_AMOSTRA_METRICAS', 5000))
+
+
+class Cronometro:
+    def __init__(self):
+        self.fases = {}  # nome da fase -> segundos
+
+    @contextmanager
+    def fase(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases[nome] = self.fases.get(nome, 0) + time.perf_counter() - inicio
+
+    def total(self):
+        return sum(self.fases.values())
+
+
+def percentil(valores, p):
+    # Nearest-rank: não interpola, devolve sempre um valor que realmente aconteceu
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicao = max(1, math.ceil(p / 100 * len(ordenados)))
+    return ordenados[posicao - 1]
+
+
+def resumir_tentativas(tentativas, janela_minutos):
+    # tentativas: linhas com user_id, resultado e as colunas t_<fase> (todas carregadas: uso no benchmark)
+    tentativas = list(tentativas)
+    contagens = Counter((t.user_id, t.resultado) for t in tentativas)
+    return resumir_contagens([(u, r, n) for (u, r), n in contagens.items()], tentativas, janela_minutos)
+
+
+def resumir_contagens(contagens, amostra, janela_minutos):
+    # contagens: (user_id, resultado, quantidade) já agrupados no banco; amostra: linhas com as colunas t_<fase>
+    enviados = 0
+    por_usuario = {}
+    for user_id, resultado, quantidade in contagens:
+        usuario = por_usuario.setdefault(user_id, {'user_id': user_id, 'total': 0, 'falhas': 0})
+        usuario['total'] += quantidade
+        if resultado == 'enviado':
+            enviados += quantidade
+        else:
+            usuario['falhas'] += quantidade
+
+    tempos = {fase: [] for fase in FASES}
+    for t in amostra:
+        for fase in FASES:
+            valor = getattr(t, f't_{fase}')
+            if valor is not None:
+                tempos[fase].append(valor)
+
+    for usuario in por_usuario.values():
+        usuario['taxa_falha'] = round(usuario['falhas'] / usuario['total'], 4)
+
+    total = sum(u['total'] for u in por_usuario.values())
+    return {
+        'total': total,
+        'enviados': enviados,
+        'falhas': total - enviados,
+        'mensagens_por_minuto': round(enviados / janela_minutos, 3) if janela_minutos else None,
+        'fases': {
+            fase: {'p50': percentil(valores, 50), 'p95': percentil(valores, 95), 'amostras': len(valores)}
+            for fase, valores in tempos.items()
+        },
+        'usuarios': sorted(por_usuario.values(), key=lambda u: u['user_id']),
+    }
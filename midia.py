@@ -0,0 +1,103 @@
+import os
+import time
+import hashlib
+import tempfile
+
+# Pillow é opcional: sem ele as imagens são guardadas como vieram
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Ao lado do código, e não na pasta de onde o processo foi chamado: o painel e o motor (e o coletor de órfãos)
+# precisam enxergar a mesma pasta. TIMESEND_PASTA_MIDIA aponta para um disco compartilhado entre máquinas.
+PASTA_MIDIA = os.path.abspath(os.environ.get('TIMESEND_PASTA_MIDIA') or
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'midia'))
+EXTENSOES = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+# Pré-processamento feito uma vez por imagem (não a cada envio)
+OTIMIZAR_IMAGENS = os.environ.get('TIMESEND_OTIMIZAR_IMAGENS', '1') == '1'
+LADO_MAXIMO = int(os.environ.get('TIMESEND_IMAGEM_LADO_MAXIMO', 1600))
+QUALIDADE_JPEG = 85
+
+# Arquivo recém-gravado ainda pode não ter o Agendamento que aponta para ele
+IDADE_MINIMA_COLETA = 3600
+
+
+def extensao_de(nome_arquivo):
+    ext = os.path.splitext(nome_arquivo or '')[1].lower()
+    return ext if ext in EXTENSOES else '.jpg'
+
+
+def copiar_com_hash(origem, destino):
+    h = hashlib.sha256()
+    for bloco in iter(lambda: origem.read(64 * 1024), b''):
+        h.update(bloco)
+        destino.write(bloco)
+    return h.hexdigest()
+
+
+def otimizar_imagem(caminho, ext):
+    # Reduz para no máximo LADO_MAXIMO px e recomprime. Devolve a extensão final, ou None se não mexeu.
+    if Image is None or not OTIMIZAR_IMAGENS or ext == '.gif':
+        return None
+    try:
+        with Image.open(caminho) as img:
+            img.load()
+        tem_transparencia = img.mode in ('RGBA', 'LA', 'P')
+        grande = max(img.size) > LADO_MAXIMO
+        if not grande and ext in ('.jpg', '.jpeg'):
+            return None
+        if grande:
+            img.thumbnail((LADO_MAXIMO, LADO_MAXIMO))
+        if tem_transparencia:
+            img.save(caminho, format='PNG', optimize=True)
+            return '.png'
+        img.convert('RGB').save(caminho, format='JPEG', quality=QUALIDADE_JPEG, optimize=True)
+        return '.jpg'
+    except Exception as e:
+        print(f"[INFO] Imagem mantida sem otimização: {e}")
+        return None
+
+
+def salvar_midia(arquivo, nome_arquivo):
+    # Armazenamento por conteúdo: o nome do arquivo é o SHA-256 dos bytes enviados.
+    # A mesma imagem enviada de novo reaproveita o arquivo (e a otimização) que já existe.
+    if not os.path.exists(PASTA_MIDIA):
+        os.makedirs(PASTA_MIDIA)
+
+    with tempfile.NamedTemporaryFile(dir=PASTA_MIDIA, suffix='.tmp', delete=False) as temporario:
+        digest = copiar_com_hash(arquivo, temporario)
+
+    for ext in EXTENSOES:
+        existente = os.path.join(PASTA_MIDIA, digest + ext)
+        if os.path.exists(existente):
+            os.remove(temporario.name)
+            os.utime(existente)  # Protege da coleta de órfãos até o agendamento ser gravado
+            return os.path.abspath(existente)
+
+    ext = extensao_de(nome_arquivo)
+    ext = otimizar_imagem(temporario.name, ext) or ext
+    final = os.path.join(PASTA_MIDIA, digest + ext)
+    os.replace(temporario.name, final)
+    return os.path.abspath(final)
+
+
+def coletar_orfas(referencias):
+    # referencias: {caminho gravado no banco: quantidade de agendamentos que usam o arquivo}.
+    # Os dois lados passam pelo abspath, para um caminho gravado de outro jeito não apagar um arquivo em uso.
+    removidos = 0
+    if not os.path.exists(PASTA_MIDIA):
+        return removidos
+    em_uso = {os.path.abspath(caminho) for caminho, quantidade in referencias.items() if quantidade}
+    limite = time.time() - IDADE_MINIMA_COLETA
+    for nome in os.listdir(PASTA_MIDIA):
+        caminho = os.path.abspath(os.path.join(PASTA_MIDIA, nome))
+        if caminho in em_uso or os.path.getmtime(caminho) > limite:
+            continue
+        try:
+            os.remove(caminho)
+            removidos += 1
+        except OSError:
+            pass
+    return removidos
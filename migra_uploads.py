@@ -0,0 +1,30 @@
+import os
+from models import app, db, Campanha, Agendamento
+from midia import salvar_midia, PASTA_MIDIA
+
+# Move as imagens antigas (uploads/<timestamp>_<nome>) para o armazenamento por conteúdo.
+# Arquivos repetidos viram um só, e os agendamentos passam a apontar para ele.
+with app.app_context():
+    print("Migrando imagens para uploads/midia...")
+    pasta_midia = os.path.abspath(PASTA_MIDIA)
+    try:
+        # Campanhas e linhas antigas de agendamento (de antes do atualiza_campanhas.py)
+        caminhos = set()
+        for tabela in (Campanha, Agendamento):
+            caminhos.update(c for (c,) in db.session.query(tabela.imagem_path).filter(
+                tabela.imagem_path.isnot(None)).distinct())
+        migrados = 0
+        for caminho in caminhos:
+            if caminho.startswith(pasta_midia) or not os.path.exists(caminho):
+                continue
+            with open(caminho, 'rb') as arquivo:
+                novo = salvar_midia(arquivo, caminho)
+            for tabela in (Campanha, Agendamento):
+                tabela.query.filter_by(imagem_path=caminho).update(
+                    {'imagem_path': novo}, synchronize_session=False)
+            db.session.commit()
+            os.remove(caminho)
+            migrados += 1
+        print(f"[OK] {migrados} imagens migradas.")
+    except Exception as e:
+        print(f"[ERRO] Falha na migração: {e}")
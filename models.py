@@ -12,12 +12,29 @@ senha = "****"
 host = "****"
 banco = "timesend_db"
 
-app.config['SQLALCHEMY_DATABASE_URI'] = f'mysql+pymysql://{usuario}:{senha}@{host}/{banco}'
+# TIMESEND_DATABASE_URI troca o banco sem editar o arquivo (ex.: sqlite:///benchmark.db no benchmark.py)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('TIMESEND_DATABASE_URI', f'mysql+pymysql://{usuario}:{senha}@{host}/{banco}')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_POOL_RECYCLE'] = 280
 
 db = SQLAlchemy(app)
 
+# --- VALORES FIXOS (compartilhados pelo painel e pelo motor de envios) ---
+
+# Como o robô coloca o texto na conversa (veja digitacao.py)
+MODOS_TEXTO = ('colar', 'digitar')
+MODO_PADRAO = 'colar'
+
+# Um pareamento nesses estados já terminou: um novo clique em "Gerar QR Code" pede outro
+ESTADOS_FINAIS = ('conectado', 'expirado', 'erro')
+
+def criar_indices(modelo, *nomes):
+    # Cria (se faltarem) só os índices pedidos: cada atualiza_*.py cuida dos índices das colunas que ele
+    # mesmo cria, sem depender da ordem em que os scripts rodam
+    for indice in modelo.__table__.indexes:
+        if indice.name in nomes:
+            indice.create(db.engine, checkfirst=True)
+
 # --- CLASSES ---
 
 class User(UserMixin, db.Model):
@@ -32,17 +49,125 @@ class Cliente(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
     telefone = db.Column(db.String(20), nullable=False, unique=True)
-    criado_em = db.Column(db.String(20))
+    criado_em = db.Column(db.DateTime)
+
+class ImportacaoClientes(db.Model):
+    # Andamento da última importação de CSV de cada usuário. Fica no banco porque a thread que importa roda
+    # num worker do painel e a consulta de progresso pode cair em outro (gunicorn -w 4).
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    status = db.Column(db.String(20), nullable=False)  # processando -> concluido | erro
+    linhas = db.Column(db.Integer, default=0)
+    novos = db.Column(db.Integer, default=0)
+    duplicados = db.Column(db.Integer, default=0)
+    rejeitados = db.Column(db.Integer, default=0)
+    erro = db.Column(db.String(255), nullable=True)
+    atualizado_em = db.Column(db.DateTime)
+
+class Campanha(db.Model):
+    # Conteúdo e horário de um agendamento, gravados uma vez só. Cada destino é uma linha enxuta em Agendamento.
+    # A mensagem aceita campos como {nome}, preenchidos com os dados do Cliente na hora do envio.
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    mensagem = db.Column(db.Text, nullable=True)
+    imagem_path = db.Column(db.String(200), nullable=True)
+    dias_semana = db.Column(db.String(50))
+    horario = db.Column(db.String(5))
+    hora_envio = db.Column(db.Time, nullable=True)
+    # Como o robô coloca o texto na conversa: 'colar' (rápido) ou 'digitar' (tecla a tecla)
+    modo_texto = db.Column(db.String(10), nullable=True)
+    criado_em = db.Column(db.DateTime)
+
+    __table_args__ = (db.Index('ix_campanha_user_id', 'user_id', 'id'),)
 
 class Agendamento(db.Model):
+    # Um destino de uma Campanha
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    campanha_id = db.Column(db.Integer, db.ForeignKey('campanha.id'), nullable=True, index=True)
     destinatario = db.Column(db.String(255), nullable=False)
+    ativo = db.Column(db.Boolean, default=True)
+    # Próxima execução já calculada (por destino: um envio adiado não arrasta a campanha inteira)
+    next_run_at = db.Column(db.DateTime, nullable=True)
+    # Reserva do motor de envios que pegou o destino vencido. O motor renova enquanto o envio está na fila
+    # dele; se o motor cair, a reserva vence e outro motor pega o destino de novo.
+    reservado_por = db.Column(db.String(100), nullable=True)
+    reservado_ate = db.Column(db.DateTime, nullable=True)
+    # Falhas seguidas nesta ocorrência. Esgotadas (ou erro definitivo, como número sem WhatsApp), o envio único
+    # sai da fila (ativo = False) com falhou_em preenchido: é a lista de falhas do painel. O recorrente
+    # perde só a ocorrência e vai para a próxima.
+    tentativas = db.Column(db.Integer, default=0)
+    falhou_em = db.Column(db.DateTime, nullable=True)
+    erro_final = db.Column(db.String(255), nullable=True)
+
+    # Colunas da versão antiga, com uma cópia do conteúdo por destino. As linhas novas ficam em branco;
+    # o atualiza_campanhas.py move o que houver para a tabela campanha.
     mensagem = db.Column(db.Text, nullable=True)
     imagem_path = db.Column(db.String(200), nullable=True)
     dias_semana = db.Column(db.String(50)) 
     horario = db.Column(db.String(5)) 
-    ativo = db.Column(db.Boolean, default=True)
+    hora_envio = db.Column(db.Time, nullable=True)
+    modo_texto = db.Column(db.String(10), nullable=True)
+
+    __table_args__ = (
+        # Listagem do painel por usuário, ordenada por id
+        db.Index('ix_agendamento_user_id', 'user_id', 'id'),
+        # "O que vence agora?" e recarga dos pendentes na inicialização
+        db.Index('ix_agendamento_ativo_proxima', 'ativo', 'next_run_at'),
+        # Renovação e liberação das reservas de um motor
+        db.Index('ix_agendamento_reservado_por', 'reservado_por'),
+        # Lista de falhas do painel, por usuário
+        db.Index('ix_agendamento_falhas', 'user_id', 'falhou_em'),
+    )
+
+class TentativaEnvio(db.Model):
+    # Uma linha por execução de um Agendamento: resultado e quanto tempo cada fase levou (segundos)
+    id = db.Column(db.Integer, primary_key=True)
+    agendamento_id = db.Column(db.Integer, nullable=True, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    inicio = db.Column(db.DateTime, nullable=False)
+    resultado = db.Column(db.String(20), nullable=False)  # 'enviado' ou 'falha'
+    erro = db.Column(db.String(100), nullable=True)       # Classe da exceção
+    detalhe = db.Column(db.String(255), nullable=True)
+    t_navegador = db.Column(db.Float, nullable=True)
+    t_pagina = db.Column(db.Float, nullable=True)
+    t_conversa = db.Column(db.Float, nullable=True)
+    t_texto = db.Column(db.Float, nullable=True)
+    t_midia = db.Column(db.Float, nullable=True)
+    t_envio = db.Column(db.Float, nullable=True)
+    t_total = db.Column(db.Float, nullable=True)
+
+    # Métricas por período (e por usuário dentro do período)
+    __table_args__ = (db.Index('ix_tentativa_envio_inicio', 'inicio', 'user_id'),)
+
+class ContadorDiario(db.Model):
+    # Totais de envio por usuário e dia, somados pelo motor junto com cada tentativa. Os relatórios leem daqui
+    # em vez de agrupar a tentativa_envio inteira.
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # Sem FK: fica para os relatórios
+    dia = db.Column(db.Date, primary_key=True)
+    enviados = db.Column(db.Integer, nullable=False, default=0)
+    falhas = db.Column(db.Integer, nullable=False, default=0)       # Tentativas que falharam (inclui as reenviadas)
+    descartados = db.Column(db.Integer, nullable=False, default=0)  # Destinos que foram para a lista de falhas
+
+    __table_args__ = (db.Index('ix_contador_diario_dia', 'dia'),)
+
+class Pareamento(db.Model):
+    # Leitura do QR Code: o painel grava o pedido e o motor de envios (dono dos navegadores)
+    # publica aqui o QR atual e o estado. Uma linha por usuário.
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    estado = db.Column(db.String(20), nullable=False)  # pedido -> iniciando -> aguardando_leitura -> conectado | expirado | erro
+    qr = db.Column(db.Text, nullable=True)             # PNG do QR atual (data URL)
+    versao = db.Column(db.Integer, default=0)          # Muda a cada novo QR ou estado; a página espera por ela
+    erro = db.Column(db.String(255), nullable=True)
+    atualizado_em = db.Column(db.DateTime)
+
+class EstadoMotor(db.Model):
+    # Retrato de cada processo do motor de envios, gravado de tempos em tempos: os perfis que ele hospeda
+    # (os pedidos de QR Code vão para quem já tem o perfil) e os limites das contas e o cache de grupos,
+    # que o painel mostra em /api/metricas sem falar com o motor
+    no = db.Column(db.String(100), primary_key=True)  # "maquina:pid"
+    perfis = db.Column(db.Text, nullable=True)         # Perfis de WhatsApp (user_id) desta máquina: "1,7,12"
+    dados = db.Column(db.Text, nullable=True)          # JSON
+    atualizado_em = db.Column(db.DateTime)
 
 if __name__ == "__main__":
     with app.app_context():
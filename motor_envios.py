@@ -0,0 +1,655 @@
+import os
+import re
+import time
+import json
+import socket
+import atexit
+import threading
+from datetime import datetime, timedelta
+from apscheduler.schedulers.background import BackgroundScheduler
+
+# --- IMPORTAÇÕES DO SELENIUM ---
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import TimeoutException, NoSuchElementException
+
+from models import app, db, Campanha, Agendamento, Cliente, TentativaEnvio, Pareamento, EstadoMotor
+from metricas import Cronometro
+from midia import coletar_orfas
+from digitacao import inserir_texto
+from prontidao import (URL_WHATSAPP, TEMPO_LISTA_CONVERSAS, NUMERO_INVALIDO, esperar_caixa_texto,
+                       esperar_conversa_telefone, esperar_busca, esperar_resultado_busca, esperar_botao_enviar, esperar_preview_midia,
+                       esperar_legenda, ultima_bolha_saida, esperar_bolha_enviada)
+from pool_navegadores import PoolNavegadores, navegador_responde, servico_chromedriver, perfis_locais
+from despachante import Despachante
+from indice_despacho import proxima_execucao
+from resolvedor_grupos import ResolvedorGrupos, id_conversa_aberta
+from pareamento import ServicoPareamento
+from limitador import LimitadorEnvios
+from personalizacao import renderizar
+from reenvio import ErroDefinitivo, PoliticaReenvio
+from relatorios import somar_contador
+
+# Motor de envios: o processo dono do agendador e dos navegadores. O painel (app.py) só grava campanhas
+# e pedidos de QR Code no banco; o motor reserva os destinos vencidos e envia.
+#
+# Uso:  python motor_envios.py
+#
+# Vários motores (em máquinas diferentes) podem usar o mesmo banco. Cada um só pega os destinos dos
+# perfis de WhatsApp que tem na própria pasta sessoes_usuarios (sessao_zap_{user_id}), com uma reserva
+# que vence se o motor cair.
+
+# Se a próxima liberação do limitador estiver mais longe que isso, a campanha devolve o navegador
+# e o resto dos envios volta para o índice de despacho no horário liberado
+ESPERA_MAXIMA_LIMITE = int(os.environ.get('TIMESEND_ESPERA_MAXIMA_LIMITE', 300))
+
+# De quanto em quanto tempo (segundos) o motor procura destinos vencidos e pedidos de QR Code no banco,
+# e grava o próprio retrato (perfis, limites das contas, cache de grupos)
+INTERVALO_BUSCA = int(os.environ.get('TIMESEND_INTERVALO_BUSCA', 5))
+INTERVALO_PAREAMENTO = 1
+INTERVALO_ESTADO = 30
+
+# Reserva de cada destino pego da fila (segundos). O motor renova a cada um terço desse tempo enquanto
+# o destino espera a vez; se o motor cair, outro pega o destino depois que a reserva vencer.
+TEMPO_RESERVA = int(os.environ.get('TIMESEND_TEMPO_RESERVA', 300))
+# Quantos destinos vencidos um tique reserva de uma vez
+LOTE_RESERVA = int(os.environ.get('TIMESEND_LOTE_RESERVA', 500))
+
+# Texto + imagem vão numa mensagem só (imagem com legenda). Com 0, ou se o campo de legenda não aparecer,
+# saem como duas mensagens
+IMAGEM_COM_LEGENDA = os.environ.get('TIMESEND_IMAGEM_COM_LEGENDA', '1') == '1'
+
+NOME_NO = f"{socket.gethostname()}:{os.getpid()}"
+
+# Um Chrome "quente" por usuário, reaproveitado entre os envios
+pool_navegadores = PoolNavegadores()
+# Um envio por perfil e no máximo um worker por navegador permitido no pool
+despachante = Despachante(pool_navegadores.max_navegadores)
+
+# Destinos reservados por este motor que ainda estão na fila do despachante ou sendo enviados.
+# Se uma renovação falhar e a reserva vencer, o mesmo destino não entra duas vezes na fila.
+reservas_locais = set()
+_lock_reservas = threading.Lock()
+
+
+def historico_envios(user_id):
+    # Tentativas (enviadas ou não) das últimas 24 h: o limitador continua contando depois de um reinício
+    with app.app_context():
+        return [inicio for (inicio,) in db.session.query(TentativaEnvio.inicio).filter(
+            TentativaEnvio.user_id == user_id, TentativaEnvio.inicio >= datetime.now() - timedelta(days=1))]
+
+
+# Ritmo anti-bloqueio por conta de WhatsApp, compartilhado por todas as campanhas do usuário
+limitador_envios = LimitadorEnvios(historico=historico_envios)
+
+# Nome do grupo -> id do chat, por usuário, para os envios repetidos pularem a busca
+resolvedor_grupos = ResolvedorGrupos()
+
+# Destino que falhou volta para a fila com espera exponencial, até desistir (lista de falhas do painel)
+politica_reenvio = PoliticaReenvio()
+
+
+def publicar_pareamento(retrato):
+    # Cada QR novo ou mudança de estado vai para a tabela pareamento, de onde o painel lê
+    with app.app_context():
+        Pareamento.query.filter_by(user_id=retrato['user_id']).update({
+            'estado': retrato['estado'], 'qr': retrato['qr'], 'erro': retrato['erro'],
+            'versao': Pareamento.versao + 1, 'atualizado_em': datetime.now(),
+        }, synchronize_session=False)
+        db.session.commit()
+
+
+# Leitura do QR Code: um pareamento por usuário, com o QR publicado no banco para a página.
+# Um novo pareamento pode ser de outra conta, com outros grupos: limpa o cache de grupos.
+servico_pareamento = ServicoPareamento(pool_navegadores, ao_iniciar=resolvedor_grupos.esquecer_usuario,
+                                       ao_publicar=publicar_pareamento)
+
+
+# ==========================================
+#        FILA NO BANCO (RESERVAS ENTRE MOTORES)
+# ==========================================
+
+def tempo_reserva():
+    # Sem microssegundos: o DATETIME do MySQL os descarta
+    return (datetime.now() + timedelta(seconds=TEMPO_RESERVA)).replace(microsecond=0)
+
+
+def despachar_vencidos():
+    # Tique do motor: reserva os destinos vencidos dos perfis desta máquina e entrega aos workers.
+    # FOR UPDATE SKIP LOCKED deixa vários motores reservarem ao mesmo tempo sem um esperar o outro, e o
+    # UPDATE repete a condição da reserva, então bancos sem SKIP LOCKED (SQLite) também não duplicam.
+    perfis = perfis_locais()
+    if not perfis:
+        return 0
+    agora = datetime.now()
+    livre = db.or_(Agendamento.reservado_ate.is_(None), Agendamento.reservado_ate < agora)
+    try:
+        with app.app_context():
+            ids = [i for (i,) in db.session.query(Agendamento.id).filter(
+                Agendamento.ativo == True, Agendamento.next_run_at <= agora, Agendamento.user_id.in_(perfis), livre
+            ).order_by(Agendamento.next_run_at).limit(LOTE_RESERVA).with_for_update(skip_locked=True)]
+            if not ids:
+                db.session.rollback()
+                return 0
+            Agendamento.query.filter(Agendamento.id.in_(ids), livre).update(
+                {'reservado_por': NOME_NO, 'reservado_ate': tempo_reserva()}, synchronize_session=False)
+            db.session.commit()
+    except Exception as e:
+        # Banco fora do ar, por exemplo: tenta de novo no próximo tique
+        print(f"[ERRO] Falha ao reservar os envios vencidos: {e}")
+        return 0
+
+    try:
+        return robo_campanha(ids, reservado_por=NOME_NO)
+    except Exception as e:
+        print(f"[ERRO] Falha ao despachar {len(ids)} envios: {e}")
+        liberar_reservas(ids)
+        return 0
+
+
+def renovar_reservas():
+    # Os destinos ainda na fila deste motor não podem ser pegos por outro. Só renova o que está na memória
+    # do motor: um destino que saiu dela sem soltar a reserva não fica preso para sempre.
+    with _lock_reservas:
+        ids = list(reservas_locais)
+    if not ids:
+        return
+    try:
+        with app.app_context():
+            Agendamento.query.filter(Agendamento.reservado_por == NOME_NO, Agendamento.id.in_(ids)).update(
+                {'reservado_ate': tempo_reserva()}, synchronize_session=False)
+            db.session.commit()
+    except Exception as e:
+        print(f"[ERRO] Não foi possível renovar as reservas do motor: {e}")
+
+
+def liberar_reservas(ids=None):
+    # Devolve os destinos para a fila na hora (na saída do motor, todos os dele)
+    try:
+        with app.app_context():
+            query = Agendamento.query.filter(Agendamento.reservado_por == NOME_NO)
+            if ids is not None:
+                query = query.filter(Agendamento.id.in_(ids))
+            query.update({'reservado_por': None, 'reservado_ate': None}, synchronize_session=False)
+            db.session.commit()
+    finally:
+        # Mesmo com o banco fora do ar: sem renovação, a reserva vence e outro tique pega o destino
+        with _lock_reservas:
+            if ids is None:
+                reservas_locais.clear()
+            else:
+                reservas_locais.difference_update(ids)
+
+
+def preencher_proximas():
+    # Linhas antigas sem next_run_at nunca venceriam na fila: calcula uma vez, na subida
+    with app.app_context():
+        linhas = db.session.query(Agendamento.id, Campanha.hora_envio, Campanha.dias_semana).join(
+            Campanha, Agendamento.campanha_id == Campanha.id).filter(
+            Agendamento.ativo == True, Agendamento.next_run_at.is_(None), Campanha.hora_envio.isnot(None))
+        grupos = {}
+        for linha in linhas:
+            grupos.setdefault((linha.hora_envio, linha.dias_semana), []).append(linha.id)
+        for (hora_envio, frequencia), ids in grupos.items():
+            Agendamento.query.filter(Agendamento.id.in_(ids)).update(
+                {'next_run_at': proxima_execucao(hora_envio, frequencia)}, synchronize_session=False)
+        db.session.commit()
+
+
+def perfis_de_outros_motores():
+    # Perfis anunciados pelos outros motores que gravaram o retrato há pouco
+    with app.app_context():
+        anuncios = db.session.query(EstadoMotor.perfis).filter(
+            EstadoMotor.no != NOME_NO,
+            EstadoMotor.atualizado_em >= datetime.now() - timedelta(seconds=3 * INTERVALO_ESTADO)).all()
+    return {int(u) for (perfis,) in anuncios for u in (perfis or '').split(',') if u}
+
+
+def atender_pareamentos():
+    # Pedidos de QR Code gravados pelo painel. O UPDATE condicional garante um atendimento por pedido.
+    # O perfil que já mora em outro motor é pareado lá; um perfil novo fica com o primeiro que pegar.
+    atendidos = []
+    with app.app_context():
+        pedidos = [user_id for (user_id,) in db.session.query(Pareamento.user_id).filter(
+            Pareamento.estado == 'pedido')]
+        if not pedidos:
+            return
+        meus, de_outros = perfis_locais(), perfis_de_outros_motores()
+        for user_id in pedidos:
+            if user_id in de_outros and user_id not in meus:
+                continue
+            tomados = Pareamento.query.filter_by(user_id=user_id, estado='pedido').update(
+                {'estado': 'iniciando', 'versao': Pareamento.versao + 1, 'atualizado_em': datetime.now()},
+                synchronize_session=False)
+            db.session.commit()
+            if tomados:
+                atendidos.append(user_id)
+
+    for user_id in atendidos:
+        sessao = servico_pareamento.iniciar(user_id)
+        if sessao.versao:
+            # Já havia um pareamento rodando: republica o QR atual para a página não ficar esperando o próximo
+            publicar_pareamento(sessao.retrato())
+
+
+def publicar_estado():
+    usuarios = limitador_envios.usuarios() | resolvedor_grupos.usuarios()
+    dados = {
+        'limite_envio': {user_id: limitador_envios.situacao(user_id) for user_id in usuarios},
+        'cache_grupos': {user_id: resolvedor_grupos.estatisticas(user_id) for user_id in usuarios},
+        'cache_grupos_total': resolvedor_grupos.estatisticas(),
+        'envios_reservados': len(reservas_locais),
+    }
+    perfis = ','.join(str(user_id) for user_id in sorted(perfis_locais()))
+    try:
+        with app.app_context():
+            db.session.merge(EstadoMotor(no=NOME_NO, perfis=perfis, dados=json.dumps(dados),
+                                         atualizado_em=datetime.now()))
+            db.session.commit()
+    except Exception as e:
+        print(f"[ERRO] Não foi possível gravar o estado do motor: {e}")
+
+
+# ==========================================
+#           AGENDAMENTO E ROBÔ
+# ==========================================
+
+def coletar_midias_orfas():
+    # Contagem de referências de cada imagem: um GROUP BY em campanha.imagem_path
+    # (e nas linhas antigas de agendamento que ainda não foram migradas)
+    with app.app_context():
+        referencias = {}
+        for tabela in (Campanha, Agendamento):
+            for caminho, quantidade in (db.session.query(tabela.imagem_path, db.func.count(tabela.id))
+                                        .filter(tabela.imagem_path.isnot(None)).group_by(tabela.imagem_path)):
+                referencias[caminho] = referencias.get(caminho, 0) + quantidade
+    removidos = coletar_orfas(referencias)
+    if removidos:
+        print(f"[OK] {removidos} imagens sem agendamento removidas.")
+
+
+def robo_campanha(agendamento_ids, reservado_por=None):
+    with app.app_context():
+        # Tarefas excluídas depois do agendamento simplesmente não voltam na consulta
+        # O conteúdo vem da campanha (editado por último) e o nome do cliente vem junto, para os campos
+        query = db.session.query(
+            Agendamento.id, Agendamento.user_id, Agendamento.destinatario,
+            Campanha.mensagem, Campanha.imagem_path, Campanha.modo_texto, Cliente.nome
+        ).join(Campanha, Agendamento.campanha_id == Campanha.id).outerjoin(
+            Cliente, Cliente.telefone == Agendamento.destinatario
+        ).filter(Agendamento.id.in_(agendamento_ids), Agendamento.ativo == True)
+        if reservado_por:
+            # Só o que a reserva deste motor realmente pegou
+            query = query.filter(Agendamento.reservado_por == reservado_por)
+        tarefas = query.order_by(Agendamento.id).all()
+        envios_por_usuario = {}
+        for tarefa in tarefas:
+            with _lock_reservas:
+                if tarefa.id in reservas_locais:
+                    continue
+                reservas_locais.add(tarefa.id)
+            envios_por_usuario.setdefault(tarefa.user_id, []).append(
+                (tarefa.id, tarefa.destinatario, tarefa.mensagem, tarefa.imagem_path, tarefa.modo_texto,
+                 tarefa.nome)
+            )
+
+    if reservado_por:
+        # Reservados sem campanha (campanha_id nulo, por exemplo) não viram envio: voltam para a fila na hora
+        soltos = set(agendamento_ids) - {tarefa.id for tarefa in tarefas}
+        if soltos:
+            liberar_reservas(soltos)
+
+    # O job do scheduler só enfileira: quem abre o navegador são os workers do despachante
+    for user_id, envios in envios_por_usuario.items():
+        despachante.enviar(user_id, executar_campanha, user_id, envios)
+    return len(tarefas)
+
+
+def executar_campanha(user_id, envios, limitador=None):
+    limitador = limitador or limitador_envios
+    pendentes = list(envios)
+    try:
+        # Fora do horário ou com o limite estourado: nem abre o navegador
+        liberacao = limitador.proxima_liberacao(user_id)
+        if (liberacao - datetime.now()).total_seconds() > ESPERA_MAXIMA_LIMITE:
+            adiar_envios(pendentes, liberacao)
+            return
+
+        inicio_navegador = time.perf_counter()
+        try:
+            with pool_navegadores.emprestar(user_id) as driver:
+                # O tempo para conseguir o navegador (abrir o Chrome, ou esperar na fila) entra no primeiro envio
+                tempo_navegador = time.perf_counter() - inicio_navegador
+                while pendentes:
+                    # O limitador é da conta: outras campanhas do mesmo usuário gastam as mesmas fichas
+                    liberacao = limitador.proxima_liberacao(user_id)
+                    espera = (liberacao - datetime.now()).total_seconds()
+                    if espera > ESPERA_MAXIMA_LIMITE:
+                        adiar_envios(pendentes, liberacao)
+                        pendentes = []
+                        break
+                    if espera > 0:
+                        time.sleep(espera)
+                    agendamento_id, destinatario, modelo, caminho_imagem, modo_texto, nome = pendentes.pop(0)
+                    # Campos como {nome} são preenchidos só agora, na hora do envio
+                    texto = renderizar(modelo, nome, destinatario)
+
+                    cronometro = Cronometro()
+                    if tempo_navegador is not None:
+                        cronometro.fases['navegador'] = tempo_navegador
+                        tempo_navegador = None
+                    inicio = datetime.now()
+                    # A ficha sai antes da tentativa, dê certo ou não: uma conta presa em falhas (conversa que
+                    # não abre, mensagem que some) também bate no WhatsApp e precisa do mesmo ritmo
+                    limitador.consumir(user_id)
+                    try:
+                        enviar_no_navegador(driver, user_id, destinatario, texto, caminho_imagem, cronometro,
+                                            modo_texto)
+                    except Exception as e:
+                        registrar_tentativa(agendamento_id, user_id, inicio, cronometro, e)
+                        falhar_envio(agendamento_id, e)
+                        # Um destino com problema não derruba o resto da campanha
+                        if not navegador_responde(driver):
+                            raise
+                        continue
+                    registrar_tentativa(agendamento_id, user_id, inicio, cronometro)
+                    concluir_envio(agendamento_id)
+        except Exception as e:
+            # O navegador não abriu ou caiu no meio: os destinos que sobraram também contam uma falha
+            for agendamento_id, *_ in pendentes:
+                registrar_tentativa(agendamento_id, user_id, datetime.now(), Cronometro(), e)
+                falhar_envio(agendamento_id, e)
+    finally:
+        # O que não terminou (nem enviado, nem falhou, nem adiado) volta para a fila na hora: o banco pode
+        # ter caído no meio, e a reserva não pode ficar presa (e renovada) neste motor
+        with _lock_reservas:
+            presos = [e[0] for e in envios if e[0] in reservas_locais]
+        if presos:
+            liberar_reservas(presos)
+
+
+def adiar_envios(envios, quando):
+    # Os envios que sobraram voltam para a fila no horário liberado, sem reserva: quando vencerem,
+    # qualquer motor com o perfil pode pegar
+    ids = tuple(e[0] for e in envios if e[0] is not None)
+    if not ids:
+        return
+    with app.app_context():
+        Agendamento.query.filter(Agendamento.id.in_(ids), Agendamento.ativo == True).update(
+            {'next_run_at': quando, 'reservado_por': None, 'reservado_ate': None}, synchronize_session=False)
+        db.session.commit()
+    with _lock_reservas:
+        reservas_locais.difference_update(ids)
+    print(f"[INFO] {len(ids)} envios adiados para {quando:%d/%m %H:%M} pelo limite da conta.")
+
+
+def registrar_tentativa(agendamento_id, user_id, inicio, cronometro, erro=None):
+    try:
+        with app.app_context():
+            tentativa = TentativaEnvio(
+                agendamento_id=agendamento_id, user_id=user_id, inicio=inicio,
+                resultado='falha' if erro else 'enviado',
+                erro=type(erro).__name__ if erro else None,
+                detalhe=str(erro)[:255] if erro else None,
+                t_total=cronometro.total(),
+                **{f't_{fase}': segundos for fase, segundos in cronometro.fases.items()}
+            )
+            db.session.add(tentativa)
+            # Totais do dia para os relatórios, na mesma transação
+            somar_contador(user_id, inicio.date(), **{'falhas' if erro else 'enviados': 1})
+            db.session.commit()
+    except Exception as e:
+        print(f"[ERRO] Não foi possível registrar a tentativa do agendamento {agendamento_id}: {e}")
+
+
+def concluir_envio(agendamento_id):
+    # Fim do destino nesta ocorrência: o envio único sai da fila e o recorrente vai para a próxima
+    # ocorrência. Nos dois casos a reserva é solta.
+    if agendamento_id is None:
+        return
+    with app.app_context():
+        campanha = db.session.query(Campanha.hora_envio, Campanha.dias_semana).join(
+            Agendamento, Agendamento.campanha_id == Campanha.id).filter(Agendamento.id == agendamento_id).first()
+        valores = {'reservado_por': None, 'reservado_ate': None, 'tentativas': 0}
+        if campanha and campanha.hora_envio and campanha.dias_semana in ('diaria', 'seg-sex'):
+            valores['next_run_at'] = proxima_execucao(campanha.hora_envio, campanha.dias_semana,
+                                                      datetime.now() + timedelta(minutes=1))
+        else:
+            valores['ativo'] = False
+        Agendamento.query.filter_by(id=agendamento_id).update(valores, synchronize_session=False)
+        db.session.commit()
+    with _lock_reservas:
+        reservas_locais.discard(agendamento_id)
+
+
+def falhar_envio(agendamento_id, erro):
+    # Falha de um destino: volta para a fila mais tarde (espera exponencial) ou, com erro definitivo ou
+    # sem tentativas sobrando, desiste desta ocorrência. O envio único sai da fila e vai para a lista de
+    # falhas do painel (que pode reenviar); o recorrente perde só esta ocorrência e segue para a próxima.
+    if agendamento_id is None:
+        return
+    with app.app_context():
+        linha = db.session.query(
+            Agendamento.user_id, Agendamento.tentativas, Campanha.hora_envio, Campanha.dias_semana
+        ).outerjoin(Campanha, Agendamento.campanha_id == Campanha.id).filter(Agendamento.id == agendamento_id).first()
+        user_id = linha.user_id if linha else None
+        tentativas = ((linha.tentativas if linha else 0) or 0) + 1
+        valores = {'tentativas': tentativas, 'reservado_por': None, 'reservado_ate': None}
+        quando = politica_reenvio.proxima_tentativa(erro, tentativas)
+        if quando:
+            valores['next_run_at'] = quando
+        else:
+            agora = datetime.now()
+            if linha and linha.hora_envio and linha.dias_semana in ('diaria', 'seg-sex'):
+                valores.update(tentativas=0, next_run_at=proxima_execucao(
+                    linha.hora_envio, linha.dias_semana, agora + timedelta(minutes=1)))
+            else:
+                valores.update(ativo=False, falhou_em=agora, erro_final=f"{type(erro).__name__}: {erro}"[:255])
+            somar_contador(user_id, agora.date(), descartados=1)
+        Agendamento.query.filter_by(id=agendamento_id).update(valores, synchronize_session=False)
+        db.session.commit()
+    with _lock_reservas:
+        reservas_locais.discard(agendamento_id)
+
+
+class ConversaNaoAbriu(Exception):
+    pass
+
+
+class AnexoNaoEncontrado(Exception):
+    pass
+
+
+class ImagemAusente(Exception):
+    # O arquivo da campanha não está nesta máquina (uploads/midia fora de um caminho compartilhado).
+    # Não é definitivo: o destino volta para a fila e pode cair num motor que tenha o arquivo.
+    pass
+
+
+class NumeroInvalido(ErroDefinitivo):
+    pass
+
+
+def abrir_conversa(driver, user_id, destinatario, cronometro):
+    apenas_numeros = re.sub(r'\D', '', destinatario)
+    is_telefone = len(apenas_numeros) > 10 and not re.search(r'[a-zA-Z]', destinatario)
+
+    if not is_telefone:
+        id_grupo = resolvedor_grupos.obter(user_id, destinatario)
+        if id_grupo:
+            caixa_texto = abrir_grupo_em_cache(driver, destinatario, id_grupo, cronometro)
+            if caixa_texto is not None:
+                return caixa_texto
+            resolvedor_grupos.invalidar(user_id, destinatario)
+
+    # Navega na mesma aba: o WhatsApp Web já está logado e com o cache quente
+    with cronometro.fase('pagina'):
+        if is_telefone:
+            driver.get(f"{URL_WHATSAPP}/send?phone={apenas_numeros}")
+        else:
+            driver.get(URL_WHATSAPP)
+
+    with cronometro.fase('conversa'):
+        try:
+            if is_telefone:
+                caixa_texto = esperar_conversa_telefone(driver)
+                if caixa_texto == NUMERO_INVALIDO:
+                    raise NumeroInvalido(f"O número {apenas_numeros} não tem WhatsApp")
+            else:
+                barra = esperar_busca(driver)
+                barra.click()
+                barra.send_keys(destinatario)
+                try:
+                    esperar_resultado_busca(driver, destinatario).click()
+                except TimeoutException:
+                    # Nenhum título exato: fica com o primeiro resultado, como antes
+                    barra.send_keys(Keys.ENTER)
+                caixa_texto = esperar_caixa_texto(driver)
+            caixa_texto.click()
+        except (TimeoutException, NoSuchElementException) as e:
+            raise ConversaNaoAbriu(f"Caixa de texto não apareceu para '{destinatario}'") from e
+
+    if not is_telefone:
+        # Só guarda o grupo que abriu pelo título exato (o "primeiro resultado" pode ser outro chat)
+        try:
+            aberto = driver.find_elements(By.CSS_SELECTOR, "#main header span[title]")
+            if aberto and aberto[0].get_attribute('title') == destinatario:
+                resolvedor_grupos.guardar(user_id, destinatario, id_conversa_aberta(driver))
+        except Exception:
+            pass
+    return caixa_texto
+
+
+def abrir_grupo_em_cache(driver, destinatario, id_grupo, cronometro):
+    # Grupo já resolvido antes: clica direto na lista de conversas, sem recarregar a página nem digitar
+    # na busca, e confere se o chat aberto é mesmo o do cache. Devolve None para cair na busca normal.
+    with cronometro.fase('pagina'):
+        if not driver.current_url.startswith(URL_WHATSAPP):
+            driver.get(URL_WHATSAPP)
+
+    with cronometro.fase('conversa'):
+        try:
+            esperar_busca(driver)  # Lista de conversas carregada
+            esperar_resultado_busca(driver, destinatario, TEMPO_LISTA_CONVERSAS).click()
+            caixa_texto = esperar_caixa_texto(driver)
+        except (TimeoutException, NoSuchElementException):
+            return None
+        if id_conversa_aberta(driver) not in (id_grupo, None):
+            return None
+        caixa_texto.click()
+    return caixa_texto
+
+
+def clicar_enviar(driver, alternativa):
+    try:
+        esperar_botao_enviar(driver).click()
+    except TimeoutException:
+        alternativa.send_keys(Keys.ENTER)
+
+
+def anexar_imagem(driver, caminho_imagem, cronometro):
+    # Anexa a imagem e devolve o botão de enviar da prévia
+    with cronometro.fase('midia'):
+        for inp in driver.find_elements(By.TAG_NAME, "input"):
+            if "image/" in (inp.get_attribute("accept") or ""):
+                inp.send_keys(caminho_imagem)
+                return esperar_preview_midia(driver)
+        raise AnexoNaoEncontrado("Campo de anexo de imagem não encontrado")
+
+
+def enviar_texto(driver, caixa_texto, texto, cronometro, modo_texto):
+    with cronometro.fase('texto'):
+        inserir_texto(driver, caixa_texto, texto, modo_texto)
+    with cronometro.fase('envio'):
+        bolha_anterior = ultima_bolha_saida(driver)
+        clicar_enviar(driver, caixa_texto)
+        esperar_bolha_enviada(driver, bolha_anterior)
+
+
+def enviar_preview(driver, botao_enviar, cronometro):
+    with cronometro.fase('envio'):
+        bolha_anterior = ultima_bolha_saida(driver)
+        botao_enviar.click()
+        esperar_bolha_enviada(driver, bolha_anterior)
+
+
+def enviar_no_navegador(driver, user_id, destinatario, texto, caminho_imagem, cronometro, modo_texto=None):
+    # Sem a imagem, mandar só o texto contaria como 'enviado' um envio incompleto
+    if caminho_imagem and not os.path.exists(caminho_imagem):
+        raise ImagemAusente(f"Imagem da campanha não encontrada neste motor: {caminho_imagem}")
+    caixa_texto = abrir_conversa(driver, user_id, destinatario, cronometro)
+    tem_imagem = bool(caminho_imagem)
+
+    if texto and tem_imagem and IMAGEM_COM_LEGENDA:
+        # Uma mensagem só: a imagem com o texto na legenda (um envio, uma confirmação)
+        botao_enviar = anexar_imagem(driver, caminho_imagem, cronometro)
+        legenda = esperar_legenda(driver)
+        if legenda is not None:
+            with cronometro.fase('texto'):
+                inserir_texto(driver, legenda, texto, modo_texto)
+            with cronometro.fase('envio'):
+                bolha_anterior = ultima_bolha_saida(driver)
+                clicar_enviar(driver, legenda)
+                esperar_bolha_enviada(driver, bolha_anterior)
+            return
+        # Sem campo de legenda: volta às duas mensagens. A prévia já está aberta, então a imagem sai
+        # primeiro e o texto depois (a caixa de texto é buscada de novo, o rodapé é redesenhado)
+        print(f"[AVISO] Campo de legenda não encontrado, enviando imagem e texto separados (usuário {user_id})")
+        enviar_preview(driver, botao_enviar, cronometro)
+        enviar_texto(driver, esperar_caixa_texto(driver), texto, cronometro, modo_texto)
+        return
+
+    if texto:
+        enviar_texto(driver, caixa_texto, texto, cronometro, modo_texto)
+
+    if tem_imagem:
+        enviar_preview(driver, anexar_imagem(driver, caminho_imagem, cronometro), cronometro)
+
+
+# ==========================================
+#           SUBIDA DO MOTOR
+# ==========================================
+
+def iniciar():
+    # Chromedriver resolvido uma vez, linhas antigas prontas para a fila e os jobs do agendador
+    preencher_proximas()
+    try:
+        servico_chromedriver()
+    except Exception as e:
+        print(f"[AVISO] chromedriver indisponível, os envios vão tentar de novo: {e}")
+
+    scheduler = BackgroundScheduler()
+    scheduler.add_job(despachar_vencidos, 'interval', seconds=INTERVALO_BUSCA, next_run_time=datetime.now())
+    scheduler.add_job(renovar_reservas, 'interval', seconds=max(1, TEMPO_RESERVA // 3))
+    scheduler.add_job(atender_pareamentos, 'interval', seconds=INTERVALO_PAREAMENTO)
+    scheduler.add_job(publicar_estado, 'interval', seconds=INTERVALO_ESTADO, next_run_time=datetime.now())
+    scheduler.add_job(pool_navegadores.limpar_ociosas, 'interval', minutes=1)
+    scheduler.add_job(coletar_midias_orfas, 'cron', hour=3)
+    scheduler.start()
+    atexit.register(encerrar, scheduler)
+    perfis = ', '.join(str(user_id) for user_id in sorted(perfis_locais())) or 'nenhum'
+    print(f"[OK] Motor de envios {NOME_NO} no ar. Perfis desta máquina: {perfis}")
+    return scheduler
+
+
+def encerrar(scheduler):
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    pool_navegadores.fechar_todas()
+    # Devolve as reservas e sai da lista de motores na hora, sem esperar vencerem
+    try:
+        liberar_reservas()
+        with app.app_context():
+            EstadoMotor.query.filter_by(no=NOME_NO).delete()
+            db.session.commit()
+    except Exception:
+        pass
+
+
+if __name__ == '__main__':
+    iniciar()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        print("[INFO] Motor de envios encerrado.")
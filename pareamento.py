@@ -0,0 +1,112 @@
+import os
+import time
+import hashlib
+import threading
+
+from selenium.common.exceptions import WebDriverException
+
+from models import ESTADOS_FINAIS
+from prontidao import SELETOR_BUSCA, URL_WHATSAPP
+
+# --- CONEXÃO DO WHATSAPP (QR CODE) ---
+TEMPO_MAXIMO_PAREAMENTO = int(os.environ.get('TIMESEND_TEMPO_PAREAMENTO', 120))  # Segundos até desistir
+INTERVALO_QR = 1  # De quanto em quanto tempo o canvas é conferido (a imagem só é gerada quando muda)
+
+# Uma única ida ao navegador por verificação: já conectado? QR na tela? Expirou ("clique para recarregar")?
+SCRIPT_ESTADO_QR = """
+if (document.querySelector(arguments[0]) || document.querySelector('#pane-side')) return {conectado: true};
+const canvas = document.querySelector('canvas');
+if (!canvas) return {conectado: false, qr: null, expirado: !!document.querySelector("span[data-icon='refresh-large']")};
+return {conectado: false, qr: canvas.toDataURL('image/png'), expirado: false};
+"""
+
+
+class SessaoPareamento:
+    def __init__(self, user_id, ao_publicar=None):
+        self.user_id = user_id
+        self.estado = 'iniciando'  # iniciando -> aguardando_leitura -> conectado | expirado | erro
+        self.qr = None             # PNG do QR atual (data URL)
+        self.versao = 0            # Muda a cada novo QR ou estado
+        self.erro = None
+        self.ao_publicar = ao_publicar  # Leva cada mudança para fora do motor (tabela pareamento)
+        self._lock = threading.Lock()
+
+    def publicar(self, estado=None, qr=None, erro=None):
+        with self._lock:
+            if estado:
+                self.estado = estado
+            if qr:
+                self.qr = qr
+            if erro:
+                self.erro = erro
+            self.versao += 1
+            retrato = self.retrato()
+        if self.ao_publicar:
+            try:
+                self.ao_publicar(retrato)
+            except Exception as e:
+                print(f"[ERRO] Não foi possível publicar o pareamento do usuário {self.user_id}: {e}")
+
+    def finalizada(self):
+        return self.estado in ESTADOS_FINAIS
+
+    def retrato(self):
+        return {'user_id': self.user_id, 'estado': self.estado, 'qr': self.qr, 'versao': self.versao,
+                'erro': self.erro}
+
+
+class ServicoPareamento:
+    # No máximo um pareamento por usuário: cliques repetidos acompanham o que já está rodando
+    # em vez de abrir outro navegador no mesmo perfil
+    def __init__(self, pool, tempo_maximo=TEMPO_MAXIMO_PAREAMENTO, ao_iniciar=None, ao_publicar=None):
+        self.pool = pool
+        self.tempo_maximo = tempo_maximo
+        self.ao_iniciar = ao_iniciar
+        self.ao_publicar = ao_publicar
+        self._sessoes = {}  # user_id -> SessaoPareamento
+        self._lock = threading.Lock()
+
+    def iniciar(self, user_id):
+        with self._lock:
+            sessao = self._sessoes.get(user_id)
+            if sessao and not sessao.finalizada():
+                return sessao
+            sessao = SessaoPareamento(user_id, self.ao_publicar)
+            self._sessoes[user_id] = sessao
+        threading.Thread(target=self._executar, args=(sessao,), daemon=True).start()
+        return sessao
+
+    def _executar(self, sessao):
+        if self.ao_iniciar:
+            self.ao_iniciar(sessao.user_id)
+        sessao.publicar('iniciando')
+        try:
+            # Usa o mesmo Chrome do pool: o perfil não pode ser aberto por dois navegadores ao mesmo tempo
+            with self.pool.emprestar(sessao.user_id) as driver:
+                driver.get(URL_WHATSAPP)
+                limite = time.monotonic() + self.tempo_maximo
+                ultimo_hash = None
+                while time.monotonic() < limite:
+                    try:
+                        situacao = driver.execute_script(SCRIPT_ESTADO_QR, SELETOR_BUSCA) or {}
+                    except WebDriverException:
+                        if driver.current_url.startswith(URL_WHATSAPP):
+                            situacao = {}  # Página ainda montando
+                        else:
+                            raise
+                    if situacao.get('conectado'):
+                        sessao.publicar('conectado')
+                        return
+                    if situacao.get('expirado'):
+                        break
+                    qr = situacao.get('qr')
+                    if qr:
+                        novo_hash = hashlib.sha1(qr.encode()).hexdigest()
+                        if novo_hash != ultimo_hash:
+                            ultimo_hash = novo_hash
+                            sessao.publicar('aguardando_leitura', qr=qr)
+                    time.sleep(INTERVALO_QR)
+                sessao.publicar('expirado')
+        except Exception as e:
+            print(f"[ERRO] Pareamento do usuário {sessao.user_id}: {e}")
+            sessao.publicar('erro', erro=str(e)[:200])
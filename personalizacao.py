@@ -0,0 +1,25 @@
+import re
+
+# Campos que podem aparecer na mensagem da campanha. Qualquer outro texto entre chaves fica como está.
+CAMPOS = ('nome', 'primeiro_nome', 'telefone')
+PADRAO_CAMPO = re.compile(r'\{(' + '|'.join(CAMPOS) + r')\}')
+
+
+def usa_campos(texto):
+    return bool(texto and PADRAO_CAMPO.search(texto))
+
+
+def renderizar(texto, nome=None, destinatario=None):
+    # "Olá {primeiro_nome}!" -> "Olá Maria!". Em grupo, {nome} é o nome do grupo.
+    # Sem cadastro do destino, os campos ficam vazios.
+    if not usa_campos(texto):
+        return texto
+    destinatario = destinatario or ''
+    grupo = bool(re.search(r'[a-zA-Z]', destinatario))
+    nome = (nome or (destinatario if grupo else '')).strip()
+    valores = {
+        'nome': nome,
+        'primeiro_nome': nome.split()[0] if nome and not grupo else nome,
+        'telefone': '' if grupo else destinatario,
+    }
+    return PADRAO_CAMPO.sub(lambda m: valores[m.group(1)], texto)
@@ -0,0 +1,304 @@
+import os
+import time
+import shutil
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
+from webdriver_manager.chrome import ChromeDriverManager
+
+# --- CONFIGURAÇÃO DO POOL ---
+# Perfil do Chrome dos envios:
+#   completo -> com janela, como sempre foi (bom para acompanhar o robô na tela)
+#   leve     -> headless, sem extensões nem tráfego de fundo, cache limitado e sem baixar fotos de perfil
+#               e mídias recebidas. Cabem bem mais navegadores na mesma RAM.
+PERFIS_NAVEGADOR = ('completo', 'leve')
+PERFIL_NAVEGADOR = os.environ.get('TIMESEND_PERFIL_NAVEGADOR', 'completo')
+if PERFIL_NAVEGADOR not in PERFIS_NAVEGADOR:
+    PERFIL_NAVEGADOR = 'completo'
+
+# Memória média de um Chrome com o WhatsApp Web aberto
+MEMORIA_POR_NAVEGADOR_MB = int(os.environ.get('TIMESEND_MEMORIA_POR_NAVEGADOR_MB',
+                                              250 if PERFIL_NAVEGADOR == 'leve' else 500))
+
+# Perfil leve: teto do cache em disco e endereços que não são carregados
+CACHE_DISCO_MB = int(os.environ.get('TIMESEND_CACHE_DISCO_MB', 32))
+URLS_BLOQUEADAS = [
+    '*://pps.whatsapp.net/*',          # Fotos de perfil
+    '*://*.cdn.whatsapp.net/v/*',      # Download de mídias recebidas (o upload usa outro endereço)
+    '*.mp4', '*.ogg', '*.webm',
+]
+
+
+def memoria_total_mb():
+    try:
+        import psutil
+        return psutil.virtual_memory().total // (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def calcular_max_navegadores():
+    # Um Chrome por núcleo, sem passar de metade da RAM da máquina
+    limite = os.cpu_count() or 1
+    memoria = memoria_total_mb()
+    if memoria:
+        limite = min(limite, (memoria // 2) // MEMORIA_POR_NAVEGADOR_MB)
+    return max(1, limite)
+
+
+# Quantos Chromes podem ficar abertos ao mesmo tempo (um por perfil de WhatsApp)
+MAX_NAVEGADORES = int(os.environ.get('TIMESEND_MAX_NAVEGADORES', 0)) or calcular_max_navegadores()
+# Depois de quantos segundos sem uso o navegador é fechado
+TEMPO_OCIOSO = int(os.environ.get('TIMESEND_TEMPO_OCIOSO', 600))
+
+PASTA_SESSOES = os.path.join(os.getcwd(), "sessoes_usuarios")
+
+
+# --- CHROMEDRIVER ---
+# Caminho fixo do chromedriver (ex.: C:\WebDriver\chromedriver.exe). Vazio = o webdriver_manager resolve,
+# uma vez por processo. O último caminho resolvido fica salvo para o servidor subir mesmo sem internet.
+CAMINHO_CHROMEDRIVER = os.environ.get('TIMESEND_CHROMEDRIVER', '')
+ARQUIVO_ULTIMO_CHROMEDRIVER = os.path.join(PASTA_SESSOES, 'chromedriver.txt')
+
+_servico = None
+_lock_servico = threading.Lock()
+
+
+def resolver_chromedriver():
+    if CAMINHO_CHROMEDRIVER:
+        return CAMINHO_CHROMEDRIVER
+    try:
+        caminho = ChromeDriverManager().install()
+        try:
+            if not os.path.exists(PASTA_SESSOES): os.makedirs(PASTA_SESSOES)
+            with open(ARQUIVO_ULTIMO_CHROMEDRIVER, 'w', encoding='utf-8') as arq:
+                arq.write(caminho)
+        except OSError:
+            pass
+        return caminho
+    except Exception as e:
+        print(f"[AVISO] webdriver_manager falhou ({e}); usando o último chromedriver conhecido.")
+    try:
+        with open(ARQUIVO_ULTIMO_CHROMEDRIVER, encoding='utf-8') as arq:
+            caminho = arq.read().strip()
+        if os.path.exists(caminho):
+            return caminho
+    except OSError:
+        pass
+    caminho = shutil.which('chromedriver')
+    if caminho:
+        return caminho
+    raise WebDriverException("chromedriver não encontrado: defina TIMESEND_CHROMEDRIVER")
+
+
+def servico_chromedriver():
+    # Um único chromedriver para o processo inteiro; cada navegador é só uma nova sessão nele
+    global _servico
+    with _lock_servico:
+        if _servico is None or _servico.process is None or _servico.process.poll() is not None:
+            servico = Service(resolver_chromedriver())
+            servico.start()
+            _servico = servico
+        return _servico
+
+
+def encerrar_chromedriver():
+    global _servico
+    with _lock_servico:
+        if _servico is not None:
+            _servico.stop()
+            _servico = None
+
+
+class ChromeCompartilhado(webdriver.Chrome):
+    # Chrome ligado ao chromedriver compartilhado: não sobe um chromedriver próprio
+    # e o quit() fecha só o navegador, deixando o serviço no ar para o próximo
+    def __init__(self, service, options):
+        # Sem self.service: o Selenium pararia o chromedriver compartilhado se a sessão falhasse
+        self.options = options
+        executor = ChromiumRemoteConnection(
+            remote_server_addr=service.service_url,
+            browser_name='chrome',
+            vendor_prefix='goog',
+            ignore_proxy=options._ignore_local_proxy,
+        )
+        RemoteWebDriver.__init__(self, command_executor=executor, options=options)
+        # Como no webdriver.Chrome: o chromedriver é local, então send_keys no input de arquivo passa o caminho
+        # direto em vez de zipar a imagem e subir pelo chromedriver a cada anexo
+        self._is_remote = False
+
+    def quit(self):
+        try:
+            RemoteWebDriver.quit(self)
+        except Exception:
+            pass
+
+
+def caminho_perfil(user_id):
+    if not os.path.exists(PASTA_SESSOES): os.makedirs(PASTA_SESSOES)
+    return os.path.join(PASTA_SESSOES, f"sessao_zap_{user_id}")
+
+
+def perfis_locais():
+    # user_ids com pasta sessao_zap_{id} nesta máquina: só eles podem ser enviados daqui
+    if not os.path.isdir(PASTA_SESSOES):
+        return set()
+    return {int(nome[len('sessao_zap_'):]) for nome in os.listdir(PASTA_SESSOES)
+            if nome.startswith('sessao_zap_') and nome[len('sessao_zap_'):].isdigit()}
+
+
+def opcoes_leves(options):
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1280,900")  # Abaixo disso o WhatsApp Web muda de layout
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-background-networking")
+    options.add_argument("--disable-component-update")
+    options.add_argument("--disable-default-apps")
+    options.add_argument("--disable-sync")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication")
+    options.add_argument("--mute-audio")
+    options.add_argument("--no-first-run")
+    options.add_argument(f"--disk-cache-size={CACHE_DISCO_MB * 1024 * 1024}")
+    options.add_argument(f"--media-cache-size={CACHE_DISCO_MB * 1024 * 1024}")
+
+
+def ajustar_driver_leve(driver):
+    # O WhatsApp Web recusa o navegador quando o user agent diz "HeadlessChrome"
+    agente = driver.execute_script("return navigator.userAgent").replace("HeadlessChrome", "Chrome")
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": agente})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": URLS_BLOQUEADAS})
+
+
+def criar_driver(user_id):
+    options = webdriver.ChromeOptions()
+    options.add_argument(f"user-data-dir={caminho_perfil(user_id)}")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-gpu")
+    if PERFIL_NAVEGADOR == 'leve':
+        opcoes_leves(options)
+    driver = ChromeCompartilhado(servico_chromedriver(), options)
+    if PERFIL_NAVEGADOR == 'leve':
+        try:
+            ajustar_driver_leve(driver)
+        except Exception:
+            driver.quit()
+            raise
+    return driver
+
+
+def navegador_responde(driver):
+    try:
+        # Qualquer comando simples serve de "ping": se o Chrome caiu, estoura exceção
+        driver.window_handles
+        return True
+    except WebDriverException:
+        return False
+
+
+class SessaoNavegador:
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.driver = None
+        self.lock = threading.Lock()       # Um envio por vez no mesmo perfil
+        self.emprestimos = 0               # Quantas threads estão usando/esperando esta sessão
+        self.ultimo_uso = time.monotonic()
+
+    def esta_viva(self):
+        return self.driver is not None and navegador_responde(self.driver)
+
+    def fechar(self):
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+
+
+class PoolNavegadores:
+    def __init__(self, max_navegadores=MAX_NAVEGADORES, tempo_ocioso=TEMPO_OCIOSO, fabrica=criar_driver):
+        self.max_navegadores = max_navegadores
+        self.tempo_ocioso = tempo_ocioso
+        self.fabrica = fabrica
+        self._sessoes = {}  # user_id -> SessaoNavegador
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def emprestar(self, user_id):
+        sessao = self._reservar(user_id)
+        try:
+            with sessao.lock:
+                # Health check: recria o Chrome se ele nunca abriu ou se caiu desde o último uso
+                if not sessao.esta_viva():
+                    sessao.fechar()
+                    sessao.driver = self.fabrica(user_id)
+                try:
+                    yield sessao.driver
+                except WebDriverException:
+                    # Navegador em estado desconhecido: descarta, o próximo empréstimo abre outro
+                    sessao.fechar()
+                    raise
+                finally:
+                    sessao.ultimo_uso = time.monotonic()
+        finally:
+            with self._cond:
+                sessao.emprestimos -= 1
+                self._cond.notify_all()
+
+    def _reservar(self, user_id):
+        while True:
+            vitima = None
+            with self._cond:
+                sessao = self._sessoes.get(user_id)
+                if sessao:
+                    sessao.emprestimos += 1
+                    return sessao
+
+                if len(self._sessoes) < self.max_navegadores:
+                    sessao = SessaoNavegador(user_id)
+                    sessao.emprestimos += 1
+                    self._sessoes[user_id] = sessao
+                    return sessao
+
+                # Limite atingido: libera o navegador parado há mais tempo ou espera alguém devolver
+                livres = [s for s in self._sessoes.values() if s.emprestimos == 0]
+                if livres:
+                    vitima = min(livres, key=lambda s: s.ultimo_uso)
+                    del self._sessoes[vitima.user_id]
+                else:
+                    self._cond.wait()
+
+            if vitima:
+                vitima.fechar()
+
+    def limpar_ociosas(self):
+        agora = time.monotonic()
+        with self._cond:
+            vencidas = [s for s in self._sessoes.values()
+                        if s.emprestimos == 0 and agora - s.ultimo_uso > self.tempo_ocioso]
+            for s in vencidas:
+                del self._sessoes[s.user_id]
+            if vencidas:
+                self._cond.notify_all()
+        for s in vencidas:
+            s.fechar()
+
+    def fechar_todas(self):
+        with self._cond:
+            sessoes = list(self._sessoes.values())
+            self._sessoes.clear()
+            self._cond.notify_all()
+        for s in sessoes:
+            s.fechar()
+        encerrar_chromedriver()
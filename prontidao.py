@@ -0,0 +1,119 @@
+import os
+
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+# --- TEMPOS MÁXIMOS DE ESPERA (segundos) ---
+# Cada espera termina assim que o sinal aparece na página; o tempo abaixo é só o limite
+TEMPO_CONVERSA = int(os.environ.get('TIMESEND_TEMPO_CONVERSA', 60))     # Caixa de texto da conversa
+TEMPO_BUSCA = int(os.environ.get('TIMESEND_TEMPO_BUSCA', 15))           # Resultado da busca de grupo
+TEMPO_LISTA_CONVERSAS = int(os.environ.get('TIMESEND_TEMPO_LISTA', 3))  # Grupo já em cache na lista lateral
+TEMPO_BOTAO_ENVIAR = int(os.environ.get('TIMESEND_TEMPO_BOTAO', 10))    # Botão de enviar habilitado
+TEMPO_PREVIEW = int(os.environ.get('TIMESEND_TEMPO_PREVIEW', 60))       # Prévia da imagem carregada
+TEMPO_BOLHA = int(os.environ.get('TIMESEND_TEMPO_BOLHA', 30))           # Mensagem aparecer na conversa
+TEMPO_LEGENDA = int(os.environ.get('TIMESEND_TEMPO_LEGENDA', 3))        # Campo de legenda na prévia já aberta
+
+INTERVALO_VERIFICACAO = 0.2
+
+# Endereço do WhatsApp Web (o whatsapp_falso.py serve uma imitação local para testes e benchmarks)
+URL_WHATSAPP = os.environ.get('TIMESEND_WHATSAPP_URL', 'https://web.whatsapp.com').rstrip('/')
+
+SELETOR_CAIXA_TEXTO = "#main footer div[contenteditable='true']"
+SELETOR_BUSCA = "div[contenteditable='true'][data-tab='3']"
+SELETOR_BOTAO_ENVIAR = "span[data-icon='send']"
+SELETOR_BOLHA_SAIDA = "div.message-out"
+# Campo de legenda da prévia de mídia ("Adicione uma legenda")
+SELETOR_LEGENDA = ("div[contenteditable='true'][aria-label*='legenda' i], "
+                   "div[contenteditable='true'][aria-label*='caption' i]")
+# Aviso que o /send?phone= mostra quando o número não tem WhatsApp
+SELETOR_AVISO = "div[data-animate-modal-popup='true']"
+TEXTOS_NUMERO_INVALIDO = ('inválido', 'invalid')
+NUMERO_INVALIDO = 'numero_invalido'
+# Relógio = pendente; um ou dois "checks" = saiu do aparelho
+ICONES_STATUS = ('msg-time', 'msg-check', 'msg-dblcheck', 'msg-dblcheck-ack')
+
+
+def esperar(driver, timeout):
+    return WebDriverWait(driver, timeout, poll_frequency=INTERVALO_VERIFICACAO)
+
+
+def esperar_caixa_texto(driver, timeout=TEMPO_CONVERSA):
+    return esperar(driver, timeout).until(EC.element_to_be_clickable((By.CSS_SELECTOR, SELETOR_CAIXA_TEXTO)))
+
+
+def esperar_conversa_telefone(driver, timeout=TEMPO_CONVERSA):
+    # Caixa de texto da conversa, ou NUMERO_INVALIDO assim que o aviso de número sem WhatsApp aparecer
+    def condicao(d):
+        try:
+            caixas = d.find_elements(By.CSS_SELECTOR, SELETOR_CAIXA_TEXTO)
+            if caixas and caixas[0].is_displayed() and caixas[0].is_enabled():
+                return caixas[0]
+            for aviso in d.find_elements(By.CSS_SELECTOR, SELETOR_AVISO):
+                if any(t in aviso.text.lower() for t in TEXTOS_NUMERO_INVALIDO):
+                    return NUMERO_INVALIDO
+        except StaleElementReferenceException:
+            pass
+        return False
+    return esperar(driver, timeout).until(condicao)
+
+
+def esperar_busca(driver, timeout=TEMPO_CONVERSA):
+    return esperar(driver, timeout).until(EC.element_to_be_clickable((By.CSS_SELECTOR, SELETOR_BUSCA)))
+
+
+def esperar_resultado_busca(driver, nome, timeout=TEMPO_BUSCA):
+    # O resultado com o título exato do grupo, na lista lateral
+    def condicao(d):
+        try:
+            for span in d.find_elements(By.CSS_SELECTOR, "#pane-side span[title]"):
+                if span.get_attribute('title') == nome:
+                    return span
+        except StaleElementReferenceException:
+            pass
+        return False
+    return esperar(driver, timeout).until(condicao)
+
+
+def esperar_botao_enviar(driver, timeout=TEMPO_BOTAO_ENVIAR):
+    return esperar(driver, timeout).until(EC.element_to_be_clickable((By.CSS_SELECTOR, SELETOR_BOTAO_ENVIAR)))
+
+
+def esperar_preview_midia(driver, timeout=TEMPO_PREVIEW):
+    # Com o rodapé vazio não existe botão de enviar; ele só aparece quando a prévia da mídia está pronta
+    return esperar_botao_enviar(driver, timeout)
+
+
+def esperar_legenda(driver, timeout=TEMPO_LEGENDA):
+    # Campo de legenda da prévia, ou None se esta versão do WhatsApp Web não tiver (ou o seletor mudou)
+    try:
+        return esperar(driver, timeout).until(EC.element_to_be_clickable((By.CSS_SELECTOR, SELETOR_LEGENDA)))
+    except TimeoutException:
+        return None
+
+
+def ultima_bolha_saida(driver):
+    bolhas = driver.find_elements(By.CSS_SELECTOR, SELETOR_BOLHA_SAIDA)
+    return bolhas[-1] if bolhas else None
+
+
+def esperar_bolha_enviada(driver, bolha_anterior, timeout=TEMPO_BOLHA):
+    # Nova bolha de saída na conversa, já com o ícone de pendente ou enviado
+    id_anterior = bolha_anterior.id if bolha_anterior is not None else None
+
+    def condicao(d):
+        try:
+            ultima = ultima_bolha_saida(d)
+            if ultima is None or ultima.id == id_anterior:
+                return False
+            for icone in ICONES_STATUS:
+                if ultima.find_elements(By.CSS_SELECTOR, f"span[data-icon='{icone}']"):
+                    return icone
+        except StaleElementReferenceException:
+            pass
+        return False
+    try:
+        return esperar(driver, timeout).until(condicao)
+    except TimeoutException:
+        raise TimeoutException("A mensagem não apareceu na conversa depois do envio")
@@ -0,0 +1,32 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+# --- NOVAS TENTATIVAS DE UM DESTINO QUE FALHOU ---
+MAX_TENTATIVAS = int(os.environ.get('TIMESEND_MAX_TENTATIVAS', 5))              # Contando a primeira
+ESPERA_REENVIO = int(os.environ.get('TIMESEND_ESPERA_REENVIO', 60))             # Segundos antes da 2ª tentativa
+ESPERA_MAXIMA_REENVIO = int(os.environ.get('TIMESEND_ESPERA_MAXIMA_REENVIO', 3600))
+
+
+class ErroDefinitivo(Exception):
+    # Falha que não melhora tentando de novo (ex.: número sem WhatsApp): vai direto para a lista de falhas
+    pass
+
+
+class PoliticaReenvio:
+    # Espera exponencial (60 s, 120 s, 240 s...) até o teto, com sorteio na metade de cima de cada espera
+    # para os destinos que falharam juntos (navegador que caiu, por exemplo) não voltarem todos no mesmo tique
+    def __init__(self, max_tentativas=MAX_TENTATIVAS, espera=ESPERA_REENVIO, espera_maxima=ESPERA_MAXIMA_REENVIO):
+        self.max_tentativas = max(1, max_tentativas)
+        self.espera = espera
+        self.espera_maxima = espera_maxima
+
+    def definitivo(self, erro):
+        return isinstance(erro, ErroDefinitivo)
+
+    def proxima_tentativa(self, erro, tentativas, agora=None):
+        # Quando tentar de novo depois da falha número `tentativas`, ou None para desistir
+        if self.definitivo(erro) or tentativas >= self.max_tentativas:
+            return None
+        espera = min(self.espera_maxima, self.espera * 2 ** (tentativas - 1))
+        return (agora or datetime.now()) + timedelta(seconds=random.uniform(espera / 2, espera))
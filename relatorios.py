@@ -0,0 +1,134 @@
+import io
+import csv
+import json
+import os
+from datetime import datetime, date
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, Agendamento, TentativaEnvio, ContadorDiario
+
+# Relatórios de envio em fluxo: a consulta roda com cursor no servidor (yield_per liga o stream_results,
+# que no pymysql vira SSCursor) e cada lote vira texto CSV ou NDJSON na hora. Nem o banco nem o painel
+# montam a tabela inteira na memória, e a leitura não trava as tabelas que o motor de envios usa.
+
+# Linhas buscadas no banco por vez e linhas por pedaço enviado ao navegador
+LOTE_RELATORIO = int(os.environ.get('TIMESEND_LOTE_RELATORIO', 1000))
+LINHAS_POR_PEDACO = 200
+
+FORMATOS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+STATUS_ENVIO = ('enviado', 'falha')
+
+COLUNAS_ENVIOS = ('tentativa_id', 'inicio', 'user_id', 'usuario', 'agendamento_id', 'campanha_id',
+                  'destinatario', 'resultado', 'erro', 'detalhe', 't_total')
+COLUNAS_DIARIO = ('dia', 'user_id', 'usuario', 'enviados', 'falhas', 'descartados')
+
+
+# ==========================================
+#        CONTADORES DIÁRIOS (MOTOR)
+# ==========================================
+
+def somar_contador(user_id, dia, **incrementos):
+    # Soma na linha do usuário/dia dentro da transação do chamador. UPDATE col = col + n é atômico entre
+    # motores; a primeira tentativa do dia insere a linha.
+    if user_id is None:
+        return
+    valores = {getattr(ContadorDiario, coluna): getattr(ContadorDiario, coluna) + n
+               for coluna, n in incrementos.items()}
+    filtro = ContadorDiario.query.filter_by(user_id=user_id, dia=dia)
+    if filtro.update(valores, synchronize_session=False):
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(ContadorDiario(user_id=user_id, dia=dia, **incrementos))
+    except IntegrityError:
+        # Outro motor criou a linha do dia no mesmo instante
+        filtro.update(valores, synchronize_session=False)
+
+
+# ==========================================
+#        CONSULTAS
+# ==========================================
+
+def consulta_envios(user_id=None, inicio=None, fim=None, status=None):
+    # Uma linha por tentativa, com o destino; o índice (inicio, user_id) cobre o período
+    consulta = select(
+        TentativaEnvio.id, TentativaEnvio.inicio, TentativaEnvio.user_id, User.username,
+        TentativaEnvio.agendamento_id, Agendamento.campanha_id, Agendamento.destinatario,
+        TentativaEnvio.resultado, TentativaEnvio.erro, TentativaEnvio.detalhe, TentativaEnvio.t_total
+    ).outerjoin(Agendamento, Agendamento.id == TentativaEnvio.agendamento_id) \
+     .outerjoin(User, User.id == TentativaEnvio.user_id)
+    if user_id is not None:
+        consulta = consulta.where(TentativaEnvio.user_id == user_id)
+    if inicio:
+        consulta = consulta.where(TentativaEnvio.inicio >= inicio)
+    if fim:
+        consulta = consulta.where(TentativaEnvio.inicio < fim)
+    if status:
+        consulta = consulta.where(TentativaEnvio.resultado == status)
+    return consulta.order_by(TentativaEnvio.inicio, TentativaEnvio.id)
+
+
+def consulta_diario(user_id=None, inicio=None, fim=None):
+    consulta = select(
+        ContadorDiario.dia, ContadorDiario.user_id, User.username,
+        ContadorDiario.enviados, ContadorDiario.falhas, ContadorDiario.descartados
+    ).outerjoin(User, User.id == ContadorDiario.user_id)
+    if user_id is not None:
+        consulta = consulta.where(ContadorDiario.user_id == user_id)
+    if inicio:
+        consulta = consulta.where(ContadorDiario.dia >= inicio.date())
+    if fim:
+        consulta = consulta.where(ContadorDiario.dia < fim.date())
+    return consulta.order_by(ContadorDiario.dia, ContadorDiario.user_id)
+
+
+# ==========================================
+#        FLUXO CSV / NDJSON
+# ==========================================
+
+def linhas_do_banco(consulta):
+    # Lotes de LOTE_RELATORIO linhas, com cursor no servidor
+    resultado = db.session.execute(consulta.execution_options(yield_per=LOTE_RELATORIO))
+    try:
+        for linha in resultado:
+            yield linha
+    finally:
+        resultado.close()
+
+
+def valor_texto(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat(sep=' ', timespec='seconds')
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+
+def gerar_csv(colunas, linhas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(colunas)
+    for n, linha in enumerate(linhas, 1):
+        escritor.writerow([valor_texto(v) for v in linha])
+        if n % LINHAS_POR_PEDACO == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def gerar_ndjson(colunas, linhas):
+    pedaco = []
+    for linha in linhas:
+        pedaco.append(json.dumps(dict(zip(colunas, (valor_texto(v) for v in linha))), ensure_ascii=False))
+        if len(pedaco) == LINHAS_POR_PEDACO:
+            yield '\n'.join(pedaco) + '\n'
+            pedaco = []
+    if pedaco:
+        yield '\n'.join(pedaco) + '\n'
+
+
+def gerar_relatorio(formato, colunas, consulta):
+    gerador = gerar_csv if formato == 'csv' else gerar_ndjson
+    return gerador(colunas, linhas_do_banco(consulta))
@@ -0,0 +1,80 @@
+import re
+from threading import Lock
+
+from selenium.common.exceptions import StaleElementReferenceException
+
+# Id de um grupo no WhatsApp: "<números>@g.us" (grupos antigos têm um hífen: "5511...-16...@g.us")
+PADRAO_ID_GRUPO = re.compile(r'(\d+(?:-\d+)?@g\.us)')
+
+# As mensagens da conversa aberta carregam o id do chat no atributo data-id
+# (ex.: "false_120363...@g.us_3EB0..._5511...@c.us")
+SCRIPT_ID_CONVERSA = """
+const mensagens = document.querySelectorAll('#main [data-id]');
+for (let i = mensagens.length - 1; i >= 0; i--) {
+    const id = mensagens[i].getAttribute('data-id');
+    if (id && id.indexOf('@') >= 0) return id;
+}
+return null;
+"""
+
+
+def id_conversa_aberta(driver):
+    try:
+        data_id = driver.execute_script(SCRIPT_ID_CONVERSA)
+    except StaleElementReferenceException:
+        return None
+    achado = PADRAO_ID_GRUPO.search(data_id or '')
+    return achado.group(1) if achado else None
+
+
+class ResolvedorGrupos:
+    # Cache por usuário: nome do grupo -> id do chat, preenchido depois da primeira busca que deu certo.
+    # Com o id em mãos, o robô abre o grupo direto pela lista de conversas e confere o id,
+    # sem digitar na busca. Se a navegação falhar ou cair em outro chat, a entrada é descartada.
+    def __init__(self):
+        self._lock = Lock()
+        self._grupos = {}  # (user_id, nome) -> id do chat
+        self.acertos = 0
+        self.faltas = 0
+        self.invalidacoes = 0
+
+    def obter(self, user_id, nome):
+        with self._lock:
+            id_chat = self._grupos.get((user_id, nome))
+            if id_chat:
+                self.acertos += 1
+            else:
+                self.faltas += 1
+            return id_chat
+
+    def guardar(self, user_id, nome, id_chat):
+        if not id_chat:
+            return
+        with self._lock:
+            self._grupos[(user_id, nome)] = id_chat
+
+    def invalidar(self, user_id, nome):
+        with self._lock:
+            if self._grupos.pop((user_id, nome), None):
+                self.invalidacoes += 1
+
+    def esquecer_usuario(self, user_id):
+        # Outra conta conectada no mesmo perfil: os ids antigos não valem mais
+        with self._lock:
+            for chave in [c for c in self._grupos if c[0] == user_id]:
+                del self._grupos[chave]
+
+    def usuarios(self):
+        with self._lock:
+            return {c[0] for c in self._grupos}
+
+    def estatisticas(self, user_id=None):
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                'grupos_em_cache': sum(1 for c in self._grupos if user_id is None or c[0] == user_id),
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'invalidacoes': self.invalidacoes,
+                'taxa_acerto': round(self.acertos / consultas, 4) if consultas else None,
+            }
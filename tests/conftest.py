@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Banco SQLite próprio dos testes, escolhido antes de importar models.py
+PASTA_TESTES = tempfile.mkdtemp(prefix='timesend_testes_')
+os.environ['TIMESEND_DATABASE_URI'] = 'sqlite:///' + os.path.join(PASTA_TESTES, 'testes.db')
+os.environ['TIMESEND_PASTA_MIDIA'] = os.path.join(PASTA_TESTES, 'midia')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# uploads/ e sessoes_usuarios/ são relativos à pasta atual: ficam na pasta dos testes, não no projeto
+os.chdir(PASTA_TESTES)
+
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from models import app as app_flask, db, User
+
+
+@pytest.fixture
+def banco():
+    # Banco novo a cada teste, com as FKs valendo como no MySQL/InnoDB
+    with app_flask.app_context():
+        event.listen(db.engine, 'connect', ativar_fks)
+        db.engine.dispose()
+        db.drop_all()
+        db.create_all()
+        yield db
+        db.session.remove()
+        event.remove(db.engine, 'connect', ativar_fks)
+
+
+def ativar_fks(conexao, _registro):
+    conexao.execute('PRAGMA foreign_keys=ON')
+
+
+@pytest.fixture
+def admin(banco):
+    usuario = User(username='admin', password=generate_password_hash('admin'), is_admin=True, is_blocked=False)
+    banco.session.add(usuario)
+    banco.session.commit()
+    return usuario
+
+
+@pytest.fixture
+def cliente_http(admin):
+    import app as servidor
+    cliente = servidor.app.test_client()
+    cliente.post('/login', data={'username': 'admin', 'password': 'admin'})
+    return cliente
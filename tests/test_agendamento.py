@@ -0,0 +1,59 @@
+import os
+import runpy
+from datetime import datetime, time
+
+import pytest
+from sqlalchemy import text, inspect
+
+from indice_despacho import proxima_execucao
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_proxima_execucao_usa_a_coluna_time():
+    sexta = datetime(2026, 10, 16, 18, 0)
+    assert proxima_execucao(time(9, 30), 'diaria', sexta) == datetime(2026, 10, 17, 9, 30)
+    assert proxima_execucao(time(9, 30), 'seg-sex', sexta) == datetime(2026, 10, 19, 9, 30)
+    assert proxima_execucao(time(20, 0), 'unica', sexta) == datetime(2026, 10, 16, 20, 0)
+
+
+def test_atualiza_agendamento_nao_depende_dos_scripts_seguintes(banco):
+    # Tabela como era antes do atualiza_agendamento.py: sem hora_envio, next_run_at, reserva nem falhas
+    with banco.engine.begin() as conexao:
+        conexao.execute(text("DROP TABLE agendamento"))
+        conexao.execute(text(
+            "CREATE TABLE agendamento (id INTEGER PRIMARY KEY, user_id INTEGER, destinatario VARCHAR(255), "
+            "mensagem TEXT, imagem_path VARCHAR(200), dias_semana VARCHAR(50), horario VARCHAR(5), ativo BOOLEAN)"))
+        conexao.execute(text("INSERT INTO agendamento (user_id, destinatario, mensagem, dias_semana, horario, ativo) "
+                             "VALUES (1, '5511999990000', 'Oi', 'diaria', '09:30', 1)"))
+
+    runpy.run_path(os.path.join(PASTA_PROJETO, 'atualiza_agendamento.py'))
+
+    hora_envio, proxima = banco.session.execute(text("SELECT hora_envio, next_run_at FROM agendamento")).one()
+    assert hora_envio.startswith('09:30')
+    assert proxima is not None
+    assert 'ix_agendamento_ativo_proxima' in {i['name'] for i in inspect(banco.engine).get_indexes('agendamento')}
+
+
+def test_atualiza_agendamento_mantem_os_envios_unicos_pendentes(admin, banco):
+    if datetime.now().strftime('%H:%M') >= '23:55':
+        pytest.skip("Não sobra horário mais tarde no mesmo dia")
+    with banco.engine.begin() as conexao:
+        conexao.execute(text("DROP TABLE agendamento"))
+        conexao.execute(text(
+            "CREATE TABLE agendamento (id INTEGER PRIMARY KEY, user_id INTEGER, destinatario VARCHAR(255), "
+            "mensagem TEXT, imagem_path VARCHAR(200), dias_semana VARCHAR(50), horario VARCHAR(5), ativo BOOLEAN)"))
+        # 1: horário já passou (enviado); 2: mais tarde hoje, ainda pendente; 3: mais tarde, mas já tem envio
+        for id_, horario in ((1, '00:00'), (2, '23:59'), (3, '23:59')):
+            conexao.execute(text("INSERT INTO agendamento (id, user_id, destinatario, mensagem, dias_semana, "
+                                 "horario, ativo) VALUES (:id, 1, '5511999990000', 'Oi', 'unica', :horario, 1)"),
+                            {'id': id_, 'horario': horario})
+        conexao.execute(text("INSERT INTO tentativa_envio (agendamento_id, user_id, inicio, resultado) "
+                             "VALUES (3, 1, :inicio, 'enviado')"), {'inicio': datetime.now()})
+
+    runpy.run_path(os.path.join(PASTA_PROJETO, 'atualiza_agendamento.py'))
+
+    linhas = {id_: (ativo, proxima) for id_, ativo, proxima in banco.session.execute(
+        text("SELECT id, ativo, next_run_at FROM agendamento"))}
+    assert [bool(linhas[i][0]) for i in (1, 2, 3)] == [False, True, False]
+    assert linhas[2][1].startswith(datetime.now().strftime('%Y-%m-%d') + ' 23:59')
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy import event, insert
+
+from models import Agendamento, Cliente
+
+
+def test_agendar_insere_destinos_em_um_executemany(banco, cliente_http):
+    banco.session.execute(insert(Cliente), [
+        {'nome': f'Cliente {i}', 'telefone': f'55119{i:08d}', 'criado_em': datetime.now()} for i in range(1000)])
+    banco.session.commit()
+    ids = [str(i) for (i,) in banco.session.query(Cliente.id)]
+
+    comandos = []
+
+    def contar(_conexao, _cursor, sql, _parametros, _contexto, executemany):
+        if sql.lstrip().upper().startswith('INSERT INTO AGENDAMENTO'):
+            comandos.append(executemany)
+
+    event.listen(banco.engine, 'before_cursor_execute', contar)
+    try:
+        cliente_http.post('/agendar', data={'texto': 'Oi {nome}', 'horario': '09:00', 'frequencia': 'diaria',
+                                            'destinatarios': ids})
+    finally:
+        event.remove(banco.engine, 'before_cursor_execute', contar)
+
+    assert comandos == [True]
+    assert Agendamento.query.count() == 1000
@@ -0,0 +1,106 @@
+import os
+import time
+import shutil
+
+import pytest
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.keys import Keys
+
+import whatsapp_falso
+from digitacao import inserir_texto
+from pool_navegadores import opcoes_leves
+from prontidao import esperar_caixa_texto
+
+# Texto colado contra o whatsapp_falso.py num Chrome de verdade: confere o texto exato que chega em /_mensagem.
+# Sem Chrome (ou chromedriver) na máquina, os testes são pulados.
+
+NAVEGADORES = ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome')
+TELEFONE = '5511999990000'
+
+# Imitam o editor do WhatsApp Web, que trata o "paste" por conta própria (preventDefault)
+SCRIPT_TRATA_COLAR = """
+document.getElementById('caixa').addEventListener('paste', function (e) {
+    e.preventDefault();
+    window.colou = true;
+    document.execCommand('insertText', false, e.clipboardData.getData('text/plain'));
+});
+"""
+SCRIPT_RECUSA_COLAR = """
+document.getElementById('caixa').addEventListener('paste', function (e) { e.preventDefault(); });
+"""
+
+
+@pytest.fixture(scope='module')
+def falso():
+    servidor = whatsapp_falso.iniciar_em_thread(0, {'latencia_pagina': 0, 'latencia_conversa': 0,
+                                                    'latencia_envio': 0, 'prefixo_invalido': ''})
+    yield servidor
+    servidor.shutdown()
+
+
+@pytest.fixture(scope='module')
+def navegador():
+    if not any(shutil.which(nome) for nome in NAVEGADORES):
+        pytest.skip("Chrome não instalado")
+    opcoes = Options()
+    opcoes_leves(opcoes)
+    opcoes.add_argument("--no-sandbox")  # Como no pool: CI e contêineres rodam como root
+    caminho = os.environ.get('TIMESEND_CHROMEDRIVER') or shutil.which('chromedriver')
+    try:
+        driver = webdriver.Chrome(service=Service(caminho) if caminho else Service(), options=opcoes)
+    except WebDriverException as e:
+        pytest.skip(f"Chrome não abriu: {e.msg}")
+    yield driver
+    driver.quit()
+
+
+@pytest.fixture
+def caixa(falso, navegador):
+    falso.app.mensagens.clear()
+    navegador.get(f'http://127.0.0.1:{falso.server_port}/send?phone={TELEFONE}')
+    return esperar_caixa_texto(navegador, 10)
+
+
+def enviar_e_ler(falso, caixa, tempo_maximo=5):
+    caixa.send_keys(Keys.ENTER)
+    fim = time.time() + tempo_maximo
+    while time.time() < fim and not falso.app.mensagens:
+        time.sleep(0.05)
+    assert len(falso.app.mensagens) == 1
+    return falso.app.mensagens[0]['texto']
+
+
+def test_colar_com_insert_text_mantem_linhas_e_emojis(falso, navegador, caixa):
+    # A página falsa não trata o "paste": o texto entra pelo insertText
+    texto = 'Olá Ana,\nsua consulta é amanhã 🎉\n\nAté já ✅👍🏽'
+
+    assert inserir_texto(navegador, caixa, texto, 'colar') == 'colar'
+    assert enviar_e_ler(falso, caixa) == texto
+
+
+def test_colar_tratado_pela_pagina(falso, navegador, caixa):
+    navegador.execute_script(SCRIPT_TRATA_COLAR)
+    texto = 'Linha 1\nLinha 2 😀'
+
+    assert inserir_texto(navegador, caixa, texto, 'colar') == 'colar'
+    assert navegador.execute_script('return window.colou === true')
+    assert enviar_e_ler(falso, caixa) == texto
+
+
+def test_colar_recusado_cai_para_digitar(falso, navegador, caixa):
+    navegador.execute_script(SCRIPT_RECUSA_COLAR)
+    texto = 'Primeira linha\nSegunda linha'
+
+    assert inserir_texto(navegador, caixa, texto, 'colar') == 'digitar'
+    # O modo digitar termina cada linha com Shift+Enter
+    assert enviar_e_ler(falso, caixa).rstrip('\n') == texto
+
+
+def test_digitar_linha_por_linha(falso, navegador, caixa):
+    texto = 'Bom dia\nTudo certo?'
+
+    assert inserir_texto(navegador, caixa, texto, 'digitar') == 'digitar'
+    assert enviar_e_ler(falso, caixa).rstrip('\n') == texto
@@ -0,0 +1,155 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+
+import motor_envios
+from models import User, Agendamento, Campanha
+
+# Fila no banco com dois motores no mesmo SQLite: cada "motor" é um NOME_NO com as próprias reservas locais
+
+
+@pytest.fixture
+def motores(admin, monkeypatch):
+    despachados = []
+    reservas = {}
+    monkeypatch.setattr(motor_envios, 'perfis_locais', lambda: {1})
+    monkeypatch.setattr(motor_envios.despachante, 'enviar',
+                        lambda user_id, funcao, _user_id, envios: despachados.append(
+                            (motor_envios.NOME_NO, [envio[0] for envio in envios])))
+
+    def usar(nome):
+        monkeypatch.setattr(motor_envios, 'NOME_NO', nome)
+        monkeypatch.setattr(motor_envios, 'reservas_locais', reservas.setdefault(nome, set()))
+        return reservas[nome]
+
+    usar.despachados = despachados
+    return usar
+
+
+def criar_destinos(banco, quantidade, com_campanha=True):
+    campanha_id = None
+    if com_campanha:
+        campanha = Campanha(user_id=1, mensagem='Oi', horario='09:30', hora_envio=time(9, 30), dias_semana='unica')
+        banco.session.add(campanha)
+        banco.session.flush()
+        campanha_id = campanha.id
+    destinos = [Agendamento(user_id=1, campanha_id=campanha_id, destinatario=f'55119999900{i:02d}', ativo=True,
+                            next_run_at=datetime.now() - timedelta(minutes=1)) for i in range(quantidade)]
+    banco.session.add_all(destinos)
+    banco.session.commit()
+    return [d.id for d in destinos]
+
+
+def reservas_no_banco(banco):
+    banco.session.expire_all()
+    return {a.id: (a.reservado_por, a.reservado_ate) for a in Agendamento.query.order_by(Agendamento.id)}
+
+
+def test_renovar_so_o_que_esta_na_memoria_do_motor(banco, motores):
+    ids = criar_destinos(banco, 3)
+    locais = motores('a:1')
+    assert motor_envios.despachar_vencidos() == 3
+    assert locais == set(ids)
+
+    # Um destino que saiu da memória sem soltar a reserva (erro no meio, por exemplo) deixa de ser renovado
+    locais.discard(ids[0])
+    antes = reservas_no_banco(banco)
+    Agendamento.query.update({'reservado_ate': datetime.now() + timedelta(seconds=5)}, synchronize_session=False)
+    banco.session.commit()
+    motor_envios.renovar_reservas()
+
+    depois = reservas_no_banco(banco)
+    assert depois[ids[0]][1] < antes[ids[0]][1]
+    assert depois[ids[1]][1] >= antes[ids[1]][1] and depois[ids[2]][1] >= antes[ids[2]][1]
+
+    # O outro motor não renova nem pega o que é do primeiro
+    motores('b:2')
+    motor_envios.renovar_reservas()
+    assert motor_envios.despachar_vencidos() == 0
+    assert {por for por, _ in reservas_no_banco(banco).values()} == {'a:1'}
+
+
+def test_reservados_sem_campanha_voltam_para_a_fila(banco, motores):
+    com_campanha = criar_destinos(banco, 2)
+    sem_campanha = criar_destinos(banco, 2, com_campanha=False)
+    locais = motores('a:1')
+
+    assert motor_envios.despachar_vencidos() == 2
+
+    reservas = reservas_no_banco(banco)
+    assert all(reservas[i][0] == 'a:1' for i in com_campanha)
+    assert all(reservas[i] == (None, None) for i in sem_campanha)
+    assert locais == set(com_campanha)
+
+
+def test_erro_no_meio_da_campanha_solta_as_reservas(banco, motores, monkeypatch):
+    ids = criar_destinos(banco, 3)
+    locais = motores('a:1')
+    motor_envios.despachar_vencidos()
+
+    def banco_fora(*_args):
+        raise RuntimeError("banco fora do ar")
+
+    # O navegador não abre e o banco cai junto: nem a falha dos destinos consegue ser gravada
+    monkeypatch.setattr(motor_envios.pool_navegadores, 'emprestar', banco_fora)
+    monkeypatch.setattr(motor_envios, 'registrar_tentativa', lambda *args: None)
+    monkeypatch.setattr(motor_envios, 'falhar_envio', banco_fora)
+    envios = [(i, '5511999990000', 'Oi', None, None, None) for i in ids]
+    with pytest.raises(RuntimeError):
+        motor_envios.executar_campanha(1, envios)
+
+    assert locais == set()
+    assert set(reservas_no_banco(banco).values()) == {(None, None)}
+
+
+def test_motor_so_reserva_os_perfis_que_tem(banco, motores):
+    banco.session.add(User(username='vendas', password='x', is_admin=False, is_blocked=False))
+    banco.session.commit()
+    meus = criar_destinos(banco, 2)
+    Agendamento.query.filter(Agendamento.id == meus[1]).update({'user_id': 2}, synchronize_session=False)
+    banco.session.commit()
+    motores('a:1')
+
+    assert motor_envios.despachar_vencidos() == 1
+
+    reservas = reservas_no_banco(banco)
+    assert reservas[meus[0]][0] == 'a:1'
+    assert reservas[meus[1]] == (None, None)
+
+
+def test_reserva_vencida_passa_para_outro_motor(banco, motores):
+    ids = criar_destinos(banco, 2)
+    locais_a = motores('a:1')
+    motor_envios.despachar_vencidos()
+
+    # O motor "a" parou de renovar (caiu): enquanto a reserva vale, "b" não pega nada
+    motores('b:2')
+    assert motor_envios.despachar_vencidos() == 0
+    Agendamento.query.update({'reservado_ate': datetime.now() - timedelta(seconds=1)}, synchronize_session=False)
+    banco.session.commit()
+    assert motor_envios.despachar_vencidos() == 2
+    assert {por for por, _ in reservas_no_banco(banco).values()} == {'b:2'}
+    assert motores.despachados == [('a:1', ids), ('b:2', ids)]
+
+    # "a" volta com os destinos na memória: não renova nem solta o que agora é de "b"
+    motores('a:1')
+    assert locais_a == set(ids)
+    motor_envios.renovar_reservas()
+    motor_envios.liberar_reservas()
+    assert {por for por, _ in reservas_no_banco(banco).values()} == {'b:2'}
+
+
+def test_saida_do_motor_solta_so_as_proprias_reservas(banco, motores, monkeypatch):
+    ids = criar_destinos(banco, 4)
+    monkeypatch.setattr(motor_envios, 'LOTE_RESERVA', 2)
+    locais_a = motores('a:1')
+    motor_envios.despachar_vencidos()
+    motores('b:2')
+    motor_envios.despachar_vencidos()
+
+    motores('a:1')
+    motor_envios.liberar_reservas()
+
+    reservas = reservas_no_banco(banco)
+    assert [reservas[i][0] for i in ids] == [None, None, 'b:2', 'b:2']
+    assert locais_a == set()
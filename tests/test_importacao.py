@@ -0,0 +1,30 @@
+import io
+import time
+
+from models import ImportacaoClientes
+
+
+def esperar_importacao(cliente_http, tempo_maximo=10):
+    fim = time.time() + tempo_maximo
+    while time.time() < fim:
+        progresso = cliente_http.get('/importar_csv/progresso').get_json()
+        if progresso.get('status') != 'processando':
+            return progresso
+        time.sleep(0.1)
+    return progresso
+
+
+def test_progresso_da_importacao_fica_no_banco(banco, cliente_http):
+    # Beto tem dígitos de menos e Caio, mais do que cabe na coluna cliente.telefone (20)
+    arquivo = io.BytesIO('Nome,Telefone\nAna,11 99999-0001\nBeto,123\nAna,11999990001\n'
+                         'Caio,55 11 99999-0002 1234567890\n'.encode('utf-8'))
+    cliente_http.post('/importar_csv', data={'arquivo_csv': (arquivo, 'clientes.csv')},
+                      content_type='multipart/form-data')
+
+    progresso = esperar_importacao(cliente_http)
+
+    assert progresso == {'status': 'concluido', 'linhas': 4, 'novos': 1, 'duplicados': 1, 'rejeitados': 2,
+                         'erro': None}
+    # Outro worker do painel lê o mesmo andamento
+    banco.session.expire_all()
+    assert banco.session.get(ImportacaoClientes, 1).status == 'concluido'
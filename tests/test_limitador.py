@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import motor_envios
+from limitador import LimitadorEnvios, ler_janelas
+from models import Agendamento, Campanha
+
+# Relógio injetado: todas as chamadas recebem o "agora" do teste
+AGORA = datetime(2026, 10, 16, 12, 0)
+
+
+def test_fichas_repoem_com_o_tempo_ate_a_rajada():
+    limitador = LimitadorEnvios(intervalo=60, rajada=2)
+
+    assert limitador.proxima_liberacao(1, AGORA) == AGORA
+    limitador.consumir(1, AGORA)
+    limitador.consumir(1, AGORA)
+
+    assert limitador.proxima_liberacao(1, AGORA) == AGORA + timedelta(seconds=60)
+    assert limitador.proxima_liberacao(1, AGORA + timedelta(seconds=30)) == AGORA + timedelta(seconds=60)
+    assert limitador.situacao(1, AGORA + timedelta(seconds=30))['fichas'] == 0.5
+    # Parada longa não acumula mais que a rajada
+    assert limitador.situacao(1, AGORA + timedelta(minutes=10))['fichas'] == 2
+
+
+def historico(_user_id):
+    # Três envios na última hora, cinco nas últimas 24 h e um que já saiu da janela
+    return [AGORA - timedelta(minutes=m) for m in (50, 40, 30)] + \
+           [AGORA - timedelta(hours=h) for h in (25, 20, 10)]
+
+
+def test_teto_por_hora_vem_do_historico():
+    limitador = LimitadorEnvios(intervalo=0, limite_hora=3, historico=historico)
+
+    # Libera quando o envio mais antigo da última hora completar uma hora
+    assert limitador.proxima_liberacao(1, AGORA) == AGORA + timedelta(minutes=10)
+    assert limitador.situacao(1, AGORA)['enviados_hora'] == 3
+
+
+def test_teto_por_dia_vem_do_historico():
+    limitador = LimitadorEnvios(intervalo=0, limite_dia=5, historico=historico)
+
+    assert limitador.situacao(1, AGORA)['enviados_dia'] == 5
+    assert limitador.proxima_liberacao(1, AGORA) == AGORA + timedelta(hours=4)
+
+
+def test_janela_que_atravessa_a_meia_noite():
+    assert ler_janelas('22:00-06:00') == [(0, 360), (1320, 1440)]
+    limitador = LimitadorEnvios(intervalo=0, janelas='22:00-06:00')
+    noite = AGORA.replace(hour=23, minute=30)
+    madrugada = AGORA.replace(hour=5, minute=0)
+
+    assert limitador.proxima_liberacao(1, AGORA.replace(hour=21)) == AGORA.replace(hour=22)
+    assert limitador.proxima_liberacao(1, noite) == noite
+    assert limitador.proxima_liberacao(1, madrugada) == madrugada
+    assert limitador.proxima_liberacao(1, AGORA.replace(hour=7)) == AGORA.replace(hour=22)
+
+
+def test_limite_longe_adia_os_envios_sem_abrir_o_navegador(admin, banco, monkeypatch):
+    campanha = Campanha(user_id=1, mensagem='Oi', horario='09:30', dias_semana='unica')
+    banco.session.add(campanha)
+    banco.session.flush()
+    destinos = [Agendamento(user_id=1, campanha_id=campanha.id, destinatario=f'551199999000{i}', ativo=True,
+                            next_run_at=datetime.now(), reservado_por=motor_envios.NOME_NO,
+                            reservado_ate=datetime.now() + timedelta(minutes=5)) for i in range(2)]
+    banco.session.add_all(destinos)
+    banco.session.commit()
+    ids = [d.id for d in destinos]
+
+    def emprestar(_user_id):
+        raise AssertionError("não devia abrir o navegador")
+
+    monkeypatch.setattr(motor_envios.pool_navegadores, 'emprestar', emprestar)
+    monkeypatch.setattr(motor_envios, 'reservas_locais', set(ids))
+    # Um envio há uma hora com teto de um por dia: libera só daqui a 23 h
+    enviado = datetime.now().replace(microsecond=0) - timedelta(hours=1)
+    limitador = LimitadorEnvios(intervalo=0, limite_dia=1, historico=lambda _user_id: [enviado])
+
+    envios = [(i, '5511999990000', 'Oi', None, None, None) for i in ids]
+    motor_envios.executar_campanha(1, envios, limitador)
+
+    banco.session.expire_all()
+    for agendamento in Agendamento.query.filter(Agendamento.id.in_(ids)):
+        assert agendamento.ativo
+        assert agendamento.next_run_at == enviado + timedelta(days=1)
+        assert agendamento.reservado_por is None and agendamento.reservado_ate is None
+    assert motor_envios.reservas_locais == set()
@@ -0,0 +1,21 @@
+from datetime import datetime, timedelta
+
+import app as servidor
+from models import TentativaEnvio
+
+
+def test_metricas_contam_tudo_e_amostram_os_tempos(banco, cliente_http, monkeypatch):
+    agora = datetime.now()
+    banco.session.add_all([
+        TentativaEnvio(user_id=1, inicio=agora - timedelta(minutes=i), resultado='falha' if i % 4 == 0 else 'enviado',
+                       t_envio=float(i))
+        for i in range(40)])
+    banco.session.commit()
+    monkeypatch.setattr(servidor, 'AMOSTRA_FASES', 10)
+
+    resumo = cliente_http.get('/api/metricas?horas=24').get_json()
+
+    assert (resumo['total'], resumo['enviados'], resumo['falhas']) == (40, 30, 10)
+    assert resumo['usuarios'] == [{'user_id': 1, 'total': 40, 'falhas': 10, 'taxa_falha': 0.25}]
+    # Só as 10 mais recentes (t_envio 0..9) entram nos percentis
+    assert resumo['fases']['envio'] == {'p50': 4.0, 'p95': 9.0, 'amostras': 10}
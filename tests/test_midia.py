@@ -0,0 +1,29 @@
+import os
+import time
+
+import midia
+
+
+def criar_arquivo(nome, idade):
+    os.makedirs(midia.PASTA_MIDIA, exist_ok=True)
+    caminho = os.path.join(midia.PASTA_MIDIA, nome)
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(b'imagem')
+    quando = time.time() - idade
+    os.utime(caminho, (quando, quando))
+    return caminho
+
+
+def test_coleta_so_as_orfas_antigas(tmp_path, monkeypatch):
+    velha = midia.IDADE_MINIMA_COLETA + 60
+    em_uso = criar_arquivo('em_uso.jpg', velha)
+    orfa = criar_arquivo('orfa.jpg', velha)
+    recente = criar_arquivo('recente.jpg', 0)
+    # Chamado de outra pasta e com o caminho gravado de outro jeito: continua sendo o mesmo arquivo
+    monkeypatch.chdir(tmp_path)
+    gravado = os.path.join(midia.PASTA_MIDIA, '..', os.path.basename(midia.PASTA_MIDIA), 'em_uso.jpg')
+
+    assert midia.coletar_orfas({gravado: 2, orfa: 0}) == 1
+
+    assert os.path.exists(em_uso) and os.path.exists(recente)
+    assert not os.path.exists(orfa)
@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+from datetime import datetime, date, time, timedelta
+
+import pytest
+
+import motor_envios
+from limitador import LimitadorEnvios
+from metricas import Cronometro
+from models import Agendamento, Campanha, ContadorDiario
+from reenvio import MAX_TENTATIVAS
+
+
+def test_imagem_ausente_falha_sem_enviar_so_o_texto():
+    # Nem chega a usar o navegador: falha antes de abrir a conversa
+    with pytest.raises(motor_envios.ImagemAusente):
+        motor_envios.enviar_no_navegador(None, 1, '5511999990000', 'Oi', '/nao/existe/imagem.png', Cronometro())
+
+
+def test_tentativa_que_falha_tambem_gasta_ficha(monkeypatch):
+    @contextmanager
+    def emprestar(_user_id):
+        yield object()
+
+    def falhar(*_args, **_kwargs):
+        raise motor_envios.ConversaNaoAbriu("Conversa não abriu")
+
+    monkeypatch.setattr(motor_envios.pool_navegadores, 'emprestar', emprestar)
+    monkeypatch.setattr(motor_envios, 'enviar_no_navegador', falhar)
+    monkeypatch.setattr(motor_envios, 'navegador_responde', lambda driver: True)
+    monkeypatch.setattr(motor_envios, 'registrar_tentativa', lambda *args, **kwargs: None)
+    monkeypatch.setattr(motor_envios, 'falhar_envio', lambda *args: None)
+    limitador = LimitadorEnvios(intervalo=0, rajada=100)
+
+    envios = [(None, f'551199999000{i}', 'Oi', None, None, None) for i in range(3)]
+    motor_envios.executar_campanha(1, envios, limitador)
+
+    assert limitador.situacao(1)['enviados_dia'] == 3
+
+
+def criar_destino(banco, dias_semana, hora_envio=time(9, 30), **campos):
+    campanha = Campanha(user_id=1, mensagem='Oi', horario=hora_envio.strftime('%H:%M'), hora_envio=hora_envio,
+                        dias_semana=dias_semana)
+    banco.session.add(campanha)
+    banco.session.flush()
+    agendamento = Agendamento(user_id=1, campanha_id=campanha.id, destinatario='5511999990000', ativo=True,
+                              next_run_at=datetime.now(), **campos)
+    banco.session.add(agendamento)
+    banco.session.commit()
+    return agendamento.id
+
+
+def test_recorrente_sem_tentativas_vai_para_a_proxima_ocorrencia(admin, banco):
+    agendamento_id = criar_destino(banco, 'diaria', tentativas=MAX_TENTATIVAS - 1, reservado_por=motor_envios.NOME_NO,
+                                   reservado_ate=datetime.now() + timedelta(minutes=5))
+
+    motor_envios.falhar_envio(agendamento_id, motor_envios.ConversaNaoAbriu("Conversa não abriu"))
+
+    banco.session.expire_all()
+    agendamento = banco.session.get(Agendamento, agendamento_id)
+    assert agendamento.ativo and agendamento.falhou_em is None
+    assert agendamento.tentativas == 0
+    assert agendamento.reservado_por is None and agendamento.reservado_ate is None
+    assert agendamento.next_run_at.time() == time(9, 30)
+    assert agendamento.next_run_at > datetime.now()
+    assert banco.session.get(ContadorDiario, (1, date.today())).descartados == 1
+
+
+def test_unica_sem_tentativas_vai_para_a_lista_de_falhas(admin, banco):
+    agendamento_id = criar_destino(banco, 'unica', tentativas=MAX_TENTATIVAS - 1)
+
+    motor_envios.falhar_envio(agendamento_id, motor_envios.ConversaNaoAbriu("Conversa não abriu"))
+
+    banco.session.expire_all()
+    agendamento = banco.session.get(Agendamento, agendamento_id)
+    assert not agendamento.ativo
+    assert agendamento.falhou_em is not None
+    assert agendamento.erro_final == 'ConversaNaoAbriu: Conversa não abriu'
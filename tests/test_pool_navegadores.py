@@ -0,0 +1,118 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+import pool_navegadores
+
+
+def test_chrome_compartilhado_nao_e_remoto(monkeypatch):
+    # Sem Chrome: a sessão não é criada, só a montagem do driver é conferida
+    monkeypatch.setattr(pool_navegadores.RemoteWebDriver, 'start_session', lambda self, capabilities: None)
+    servico = SimpleNamespace(service_url='http://127.0.0.1:9')
+
+    driver = pool_navegadores.ChromeCompartilhado(servico, Options())
+
+    assert driver._is_remote is False
+
+
+class DriverFalso:
+    # Só o que o pool usa: window_handles como "ping" e quit()
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.caiu = False
+        self.fechado = False
+
+    @property
+    def window_handles(self):
+        if self.caiu or self.fechado:
+            raise WebDriverException("chrome not reachable")
+        return ['aba']
+
+    def quit(self):
+        self.fechado = True
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [0.0]
+    monkeypatch.setattr(pool_navegadores, 'time', SimpleNamespace(monotonic=lambda: agora[0]))
+    return agora
+
+
+def criar_pool(**opcoes):
+    criados = []
+
+    def fabrica(user_id):
+        criados.append(DriverFalso(user_id))
+        return criados[-1]
+
+    pool = pool_navegadores.PoolNavegadores(fabrica=fabrica, **opcoes)
+    return pool, criados
+
+
+def test_reaproveita_o_navegador_e_recria_o_que_caiu():
+    pool, criados = criar_pool(max_navegadores=2)
+    with pool.emprestar(1) as driver:
+        primeiro = driver
+    with pool.emprestar(1) as driver:
+        assert driver is primeiro
+
+    primeiro.caiu = True
+    with pool.emprestar(1) as driver:
+        assert driver is not primeiro
+    assert primeiro.fechado and len(criados) == 2
+
+    # Erro do WebDriver no meio do uso: o navegador é descartado e o próximo empréstimo abre outro
+    with pytest.raises(WebDriverException):
+        with pool.emprestar(1) as driver:
+            raise WebDriverException("sessão perdida")
+    assert criados[1].fechado
+    with pool.emprestar(1) as driver:
+        assert driver is criados[2]
+
+
+def test_fecha_so_os_navegadores_ociosos(relogio):
+    pool, criados = criar_pool(max_navegadores=3, tempo_ocioso=10)
+    with pool.emprestar(1):
+        pass
+    relogio[0] = 8
+    with pool.emprestar(2):
+        pass
+    with pool.emprestar(3):
+        relogio[0] = 12
+        pool.limpar_ociosas()
+
+    assert [d.fechado for d in criados] == [True, False, False]
+    with pool.emprestar(1) as driver:
+        assert driver is not criados[0]
+
+
+def test_limite_de_navegadores(relogio):
+    pool, criados = criar_pool(max_navegadores=2)
+    with pool.emprestar(1):
+        pass
+    relogio[0] = 1
+    with pool.emprestar(2):
+        pass
+
+    # Cheio e ninguém usando: o parado há mais tempo (usuário 1) dá lugar ao novo
+    with pool.emprestar(3):
+        pass
+    assert [(d.user_id, d.fechado) for d in criados] == [(1, True), (2, False), (3, False)]
+
+    # Cheio e todos em uso: o usuário 4 espera alguém devolver
+    pegou = threading.Event()
+
+    def pedir_usuario_4():
+        with pool.emprestar(4):
+            pegou.set()
+
+    with pool.emprestar(2):
+        with pool.emprestar(3):
+            threading.Thread(target=pedir_usuario_4, daemon=True).start()
+            assert not pegou.wait(0.2)
+        assert pegou.wait(2)
+    assert len(criados) == 4 and sum(not d.fechado for d in criados) == 2
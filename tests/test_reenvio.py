@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import motor_envios
+import reenvio
+from models import Agendamento, Campanha
+from reenvio import PoliticaReenvio
+
+AGORA = datetime(2026, 10, 16, 12, 0)
+
+
+def esperas(politica, erro):
+    resultado = []
+    for tentativas in range(1, politica.max_tentativas + 1):
+        quando = politica.proxima_tentativa(erro, tentativas, AGORA)
+        if quando is None:
+            break
+        resultado.append((quando - AGORA).total_seconds())
+    return resultado
+
+
+def test_espera_dobra_ate_o_teto_e_desiste(monkeypatch):
+    # Sorteio no topo de cada espera para ver a sequência exata
+    monkeypatch.setattr(reenvio.random, 'uniform', lambda _minimo, maximo: maximo)
+    politica = PoliticaReenvio(max_tentativas=7, espera=60, espera_maxima=300)
+
+    assert esperas(politica, RuntimeError()) == [60, 120, 240, 300, 300, 300]
+
+
+def test_sorteio_fica_na_metade_de_cima_da_espera():
+    politica = PoliticaReenvio(max_tentativas=5, espera=60, espera_maxima=3600)
+
+    for tentativas, espera in ((1, 60), (2, 120), (3, 240), (4, 480)):
+        segundos = (politica.proxima_tentativa(RuntimeError(), tentativas, AGORA) - AGORA).total_seconds()
+        assert espera / 2 <= segundos <= espera
+    assert politica.proxima_tentativa(RuntimeError(), 5, AGORA) is None
+
+
+def test_erro_definitivo_nao_tenta_de_novo(admin, banco):
+    assert PoliticaReenvio(max_tentativas=5).proxima_tentativa(motor_envios.NumeroInvalido(), 1, AGORA) is None
+    agendamento_id = criar_falha(banco, falhou=False)
+
+    motor_envios.falhar_envio(agendamento_id, motor_envios.NumeroInvalido("O número não tem WhatsApp"))
+
+    banco.session.expire_all()
+    agendamento = banco.session.get(Agendamento, agendamento_id)
+    assert not agendamento.ativo and agendamento.tentativas == 1
+    assert agendamento.erro_final == 'NumeroInvalido: O número não tem WhatsApp'
+
+
+def criar_falha(banco, falhou=True):
+    campanha = Campanha(user_id=1, mensagem='Oi', horario='09:30', dias_semana='unica')
+    banco.session.add(campanha)
+    banco.session.flush()
+    agendamento = Agendamento(user_id=1, campanha_id=campanha.id, destinatario='5511999990000', ativo=not falhou,
+                              tentativas=5 if falhou else 0, next_run_at=datetime.now() - timedelta(hours=1))
+    if falhou:
+        agendamento.falhou_em, agendamento.erro_final = datetime.now(), 'ConversaNaoAbriu: Conversa não abriu'
+    banco.session.add(agendamento)
+    banco.session.commit()
+    return agendamento.id
+
+
+@pytest.mark.parametrize('todas', [False, True])
+def test_reenviar_falhas_volta_para_a_fila(banco, cliente_http, todas):
+    marcada, outra = criar_falha(banco), criar_falha(banco)
+    antes = datetime.now()
+
+    dados = {'todas': '1'} if todas else {'falhas': [str(marcada)]}
+    assert cliente_http.post('/reenviar_falhas', data=dados).status_code == 302
+
+    banco.session.expire_all()
+    reenviadas = [marcada, outra] if todas else [marcada]
+    for agendamento in Agendamento.query.order_by(Agendamento.id):
+        if agendamento.id in reenviadas:
+            assert agendamento.ativo and agendamento.tentativas == 0
+            assert agendamento.falhou_em is None and agendamento.erro_final is None
+            assert agendamento.next_run_at >= antes.replace(microsecond=0)
+        else:
+            assert not agendamento.ativo and agendamento.falhou_em is not None
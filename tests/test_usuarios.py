@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from werkzeug.security import generate_password_hash
+
+from models import User, Agendamento, Campanha, TentativaEnvio, Pareamento
+
+
+def criar_usuario(banco, nome):
+    usuario = User(username=nome, password=generate_password_hash('x'), is_admin=False, is_blocked=False)
+    banco.session.add(usuario)
+    banco.session.commit()
+    return usuario.id
+
+
+def test_excluir_usuario_com_tentativas(banco, cliente_http):
+    user_id = criar_usuario(banco, 'vendas')
+    campanha = Campanha(user_id=user_id, mensagem='Oi', horario='09:00', dias_semana='unica')
+    banco.session.add(campanha)
+    banco.session.flush()
+    agendamento = Agendamento(user_id=user_id, campanha_id=campanha.id, destinatario='5511999999999')
+    banco.session.add(agendamento)
+    banco.session.flush()
+    banco.session.add(TentativaEnvio(agendamento_id=agendamento.id, user_id=user_id, inicio=datetime.now(),
+                                     resultado='enviado'))
+    banco.session.commit()
+
+    resposta = cliente_http.get(f'/excluir_usuario/{user_id}')
+
+    assert resposta.status_code == 302
+    banco.session.expire_all()
+    assert banco.session.get(User, user_id) is None
+    assert TentativaEnvio.query.filter_by(user_id=user_id).count() == 0
+
+
+def test_excluir_usuario_com_pareamento(banco, cliente_http):
+    user_id = criar_usuario(banco, 'suporte')
+    banco.session.add(Pareamento(user_id=user_id, estado='conectado', versao=3, atualizado_em=datetime.now()))
+    banco.session.commit()
+
+    resposta = cliente_http.get(f'/excluir_usuario/{user_id}')
+
+    assert resposta.status_code == 302
+    banco.session.expire_all()
+    assert banco.session.get(User, user_id) is None
+    assert banco.session.get(Pareamento, user_id) is None
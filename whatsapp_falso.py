@@ -0,0 +1,293 @@
+import os
+import sys
+import json
+import time
+import threading
+
+from flask import Flask, request, jsonify, render_template_string, make_response
+
+# Imitação local do WhatsApp Web para medir o robô sem internet e sem conta de verdade.
+# Reproduz só o "contrato" de DOM que o robô usa (prontidao.py e motor_envios.py):
+#   - busca de conversas  div[contenteditable='true'][data-tab='3'] e lista #pane-side com span[title]
+#   - conversa aberta     #main header span[title], #main footer div[contenteditable='true']
+#   - botão de enviar     span[data-icon='send'] (só existe com texto na caixa ou com a prévia da imagem aberta)
+#   - anexo               input[type='file'][accept*='image/']
+#   - legenda da imagem   div[contenteditable='true'][aria-label='Adicione uma legenda'] na prévia
+#                         (TIMESEND_FALSO_LEGENDA=0 tira o campo, como nas versões sem legenda)
+#   - mensagens           div.message-out[data-id] com span[data-icon='msg-time'|'msg-check']
+#   - QR Code             canvas (quando TIMESEND_FALSO_EXIGIR_QR=1)
+#   - número inválido     div[data-animate-modal-popup] no /send?phone= (TIMESEND_FALSO_PREFIXO_INVALIDO)
+#
+# Uso:  python whatsapp_falso.py [porta]
+#       TIMESEND_WHATSAPP_URL=http://127.0.0.1:8099 python motor_envios.py
+
+CONFIG_PADRAO = {
+    'latencia_pagina': int(os.environ.get('TIMESEND_FALSO_LATENCIA_PAGINA', 300)),    # ms para servir a página
+    'latencia_conversa': int(os.environ.get('TIMESEND_FALSO_LATENCIA_CONVERSA', 200)),  # ms para abrir o chat
+    'latencia_envio': int(os.environ.get('TIMESEND_FALSO_LATENCIA_ENVIO', 300)),      # ms até o "check"
+    'latencia_preview': int(os.environ.get('TIMESEND_FALSO_LATENCIA_PREVIEW', 400)),  # ms para a prévia da imagem
+    'falha_conversa': float(os.environ.get('TIMESEND_FALSO_FALHA_CONVERSA', 0)),      # Chance do chat não abrir
+    'falha_envio': float(os.environ.get('TIMESEND_FALSO_FALHA_ENVIO', 0)),            # Chance da mensagem sumir
+    # Telefones com este começo "não têm WhatsApp": o /send?phone= mostra o aviso de número inválido
+    'prefixo_invalido': os.environ.get('TIMESEND_FALSO_PREFIXO_INVALIDO', '000'),
+    'legenda': os.environ.get('TIMESEND_FALSO_LEGENDA', '1') == '1',                  # Prévia com campo de legenda
+    'exigir_qr': os.environ.get('TIMESEND_FALSO_EXIGIR_QR', '0') == '1',
+    'tempo_qr': int(os.environ.get('TIMESEND_FALSO_TEMPO_QR', 8)),                    # s até o "celular" ler o QR
+    'troca_qr': int(os.environ.get('TIMESEND_FALSO_TROCA_QR', 3)),                    # s entre um QR e outro
+}
+
+PAGINA = """<!DOCTYPE html>
+<html lang="pt-br">
+<head>
+<meta charset="UTF-8">
+<title>WhatsApp (falso)</title>
+<style>
+    body { margin: 0; font-family: sans-serif; display: flex; height: 100vh; }
+    #side { width: 320px; border-right: 1px solid #ccc; display: flex; flex-direction: column; }
+    #pane-side div { padding: 10px; border-bottom: 1px solid #eee; cursor: pointer; }
+    #main { flex: 1; display: flex; flex-direction: column; }
+    #mensagens { flex: 1; overflow-y: auto; padding: 10px; }
+    .message-in, .message-out { margin: 4px; padding: 6px; border-radius: 6px; max-width: 60%; white-space: pre-wrap; }
+    .message-in { background: #fff; border: 1px solid #ddd; }
+    .message-out { background: #dcf8c6; margin-left: auto; }
+    [contenteditable] { border: 1px solid #ccc; padding: 8px; min-height: 20px; }
+    #preview { position: fixed; inset: 0; background: rgba(0,0,0,.6); display: flex; align-items: center; justify-content: center; }
+    span[data-icon] { display: inline-block; min-width: 16px; min-height: 16px; cursor: pointer; }
+</style>
+</head>
+<body>
+{% if not logado %}
+    <div style="margin: auto; text-align: center">
+        <p>Use o WhatsApp no seu celular</p>
+        <canvas id="qr" width="264" height="264"></canvas>
+    </div>
+    <script>
+        function desenharQr() {
+            var ctx = document.getElementById('qr').getContext('2d');
+            ctx.fillStyle = '#fff'; ctx.fillRect(0, 0, 264, 264); ctx.fillStyle = '#000';
+            for (var x = 0; x < 33; x++) for (var y = 0; y < 33; y++) {
+                if (Math.random() < 0.5) { ctx.fillRect(x * 8, y * 8, 8, 8); }
+            }
+        }
+        desenharQr();
+        setInterval(desenharQr, {{ config.troca_qr * 1000 }});
+        // O "celular" lê o código depois de alguns segundos
+        setTimeout(function () { document.cookie = 'logado=1; path=/; max-age=31536000'; location.reload(); },
+                   {{ config.tempo_qr * 1000 }});
+    </script>
+{% else %}
+    <div id="side">
+        <div contenteditable="true" data-tab="3" id="busca" title="Pesquisar"></div>
+        <div id="pane-side"></div>
+    </div>
+    <div id="main" style="display: none">
+        <header><span id="titulo" title=""></span></header>
+        <div id="mensagens"></div>
+        <footer>
+            <input type="file" id="anexo" accept="image/*,video/mp4,video/3gpp,video/quicktime" style="display: none">
+            <div contenteditable="true" data-tab="10" id="caixa"></div>
+            <span id="lugar_enviar"></span>
+        </footer>
+    </div>
+    <script>
+        var CONFIG = {{ config_json|safe }};
+        var chatAtual = null;
+
+        function idChat(nome) {
+            // Telefone -> "<numero>@c.us"; grupo -> id estável derivado do nome ("1203630...@g.us")
+            if (/^\\d+$/.test(nome)) { return nome + '@c.us'; }
+            var h = 0;
+            for (var i = 0; i < nome.length; i++) { h = (h * 31 + nome.charCodeAt(i)) >>> 0; }
+            return '1203630' + h + '@g.us';
+        }
+        function recentes() { return JSON.parse(localStorage.getItem('recentes') || '[]'); }
+        function mostrarLista(nomes) {
+            var lista = document.getElementById('pane-side');
+            lista.innerHTML = '';
+            nomes.forEach(function (nome) {
+                var item = document.createElement('div');
+                var span = document.createElement('span');
+                span.setAttribute('title', nome);
+                span.textContent = nome;
+                item.appendChild(span);
+                item.onclick = function () { abrirChat(nome); };
+                lista.appendChild(item);
+            });
+        }
+        function abrirChat(nome) {
+            document.getElementById('busca').textContent = '';
+            var r = recentes().filter(function (n) { return n !== nome; });
+            r.unshift(nome);
+            localStorage.setItem('recentes', JSON.stringify(r.slice(0, 20)));
+            mostrarLista(r.slice(0, 20));
+            document.getElementById('main').style.display = 'none';
+            if (Math.random() < CONFIG.falha_conversa) { return; }  // Chat que nunca abre
+            setTimeout(function () {
+                chatAtual = nome;
+                var titulo = document.getElementById('titulo');
+                titulo.setAttribute('title', nome);
+                titulo.textContent = nome;
+                var msgs = document.getElementById('mensagens');
+                msgs.innerHTML = '';
+                var recebida = document.createElement('div');
+                recebida.className = 'message-in';
+                recebida.setAttribute('data-id', 'false_' + idChat(nome) + '_INICIO');
+                recebida.textContent = 'Olá!';
+                msgs.appendChild(recebida);
+                document.getElementById('caixa').textContent = '';
+                atualizarBotao();
+                document.getElementById('main').style.display = 'flex';
+            }, CONFIG.latencia_conversa);
+        }
+        function botaoEnviar(destino, acao) {
+            var span = document.createElement('span');
+            span.setAttribute('data-icon', 'send');
+            span.textContent = '➤';
+            span.onclick = acao;
+            destino.appendChild(span);
+        }
+        function atualizarBotao() {
+            // Como no WhatsApp: sem texto na caixa, não existe botão de enviar
+            var lugar = document.getElementById('lugar_enviar');
+            var temTexto = document.getElementById('caixa').innerText.trim() !== '';
+            if (temTexto && !lugar.firstChild) { botaoEnviar(lugar, enviarTexto); }
+            if (!temTexto && lugar.firstChild) { lugar.innerHTML = ''; }
+        }
+        function adicionarBolha(conteudo, ehImagem, legenda) {
+            if (Math.random() < CONFIG.falha_envio) { return; }  // Mensagem que some
+            var bolha = document.createElement('div');
+            bolha.className = 'message-out';
+            bolha.setAttribute('data-id', 'true_' + idChat(chatAtual) + '_' + Date.now() + Math.floor(Math.random() * 1000));
+            if (ehImagem) { bolha.textContent = '[imagem] ' + conteudo + (legenda ? '\n' + legenda : ''); } else { bolha.textContent = conteudo; }
+            var status = document.createElement('span');
+            status.setAttribute('data-icon', 'msg-time');
+            bolha.appendChild(status);
+            document.getElementById('mensagens').appendChild(bolha);
+            setTimeout(function () { status.setAttribute('data-icon', 'msg-check'); }, CONFIG.latencia_envio);
+            navigator.sendBeacon('/_mensagem', JSON.stringify({chat: chatAtual, texto: legenda || conteudo, imagem: !!ehImagem}));
+        }
+        function enviarTexto() {
+            var caixa = document.getElementById('caixa');
+            var texto = caixa.innerText;
+            if (!texto.trim()) { return; }
+            caixa.textContent = '';
+            atualizarBotao();
+            adicionarBolha(texto, false);
+        }
+
+        document.getElementById('busca').addEventListener('input', function () {
+            // Todo grupo pesquisado "existe"; a lista mostra o próprio termo como resultado
+            var termo = this.innerText.trim();
+            mostrarLista(termo ? [termo] : recentes());
+        });
+        document.getElementById('busca').addEventListener('keydown', function (e) {
+            if (e.key === 'Enter') {
+                e.preventDefault();
+                var termo = this.innerText.trim();
+                if (termo) { abrirChat(termo); }
+            }
+        });
+        document.getElementById('caixa').addEventListener('input', atualizarBotao);
+        document.getElementById('caixa').addEventListener('keydown', function (e) {
+            if (e.key === 'Enter' && !e.shiftKey) { e.preventDefault(); enviarTexto(); }
+        });
+        document.getElementById('anexo').addEventListener('change', function () {
+            var arquivo = this.files[0];
+            if (!arquivo) { return; }
+            setTimeout(function () {
+                var preview = document.createElement('div');
+                preview.id = 'preview';
+                var caixa = document.createElement('div');
+                caixa.style.background = '#fff';
+                caixa.style.padding = '20px';
+                caixa.textContent = arquivo.name + ' ';
+                var legenda = null;
+                function enviarImagem() {
+                    preview.remove();
+                    adicionarBolha(arquivo.name, true, legenda ? legenda.innerText.trim() : '');
+                }
+                if (CONFIG.legenda) {
+                    legenda = document.createElement('div');
+                    legenda.setAttribute('contenteditable', 'true');
+                    legenda.setAttribute('aria-label', 'Adicione uma legenda');
+                    legenda.addEventListener('keydown', function (e) {
+                        if (e.key === 'Enter' && !e.shiftKey) { e.preventDefault(); enviarImagem(); }
+                    });
+                    caixa.appendChild(legenda);
+                }
+                botaoEnviar(caixa, enviarImagem);
+                preview.appendChild(caixa);
+                document.body.appendChild(preview);
+            }, CONFIG.latencia_preview);
+            this.value = '';
+        });
+
+        mostrarLista(recentes());
+        var telefone = new URLSearchParams(location.search).get('phone');
+        if (telefone && CONFIG.prefixo_invalido && telefone.indexOf(CONFIG.prefixo_invalido) === 0) {
+            var aviso = document.createElement('div');
+            aviso.setAttribute('data-animate-modal-popup', 'true');
+            aviso.textContent = 'O número de telefone compartilhado através de url é inválido.';
+            document.body.appendChild(aviso);
+        } else if (telefone) { abrirChat(telefone); }
+    </script>
+{% endif %}
+</body>
+</html>
+"""
+
+
+def criar_app(config=None):
+    config = dict(CONFIG_PADRAO, **(config or {}))
+    falso = Flask('whatsapp_falso')
+    falso.config['FALSO'] = config
+    mensagens = falso.mensagens = []  # O que "chegou" ao WhatsApp (o benchmark confere por aqui)
+    lock = threading.Lock()
+
+    def pagina():
+        time.sleep(config['latencia_pagina'] / 1000)
+        logado = not config['exigir_qr'] or request.cookies.get('logado') == '1'
+        html = render_template_string(PAGINA, logado=logado, config=config, config_json=json.dumps(config))
+        resposta = make_response(html)
+        resposta.headers['Cache-Control'] = 'no-store'
+        return resposta
+
+    falso.add_url_rule('/', 'inicio', pagina)
+    falso.add_url_rule('/send', 'send', pagina)
+
+    @falso.route('/_mensagem', methods=['POST'])
+    def registrar_mensagem():
+        dados = json.loads(request.get_data(as_text=True) or '{}')
+        dados['recebida_em'] = time.time()
+        with lock:
+            mensagens.append(dados)
+        return '', 204
+
+    @falso.route('/_estatisticas')
+    def estatisticas():
+        with lock:
+            return jsonify(total=len(mensagens), imagens=sum(1 for m in mensagens if m.get('imagem')),
+                           chats=len({m.get('chat') for m in mensagens}))
+
+    @falso.route('/_config', methods=['GET', 'POST'])
+    def ajustar_config():
+        # Muda latências e falhas sem reiniciar (vale para as próximas páginas carregadas)
+        for chave, valor in (request.get_json(silent=True) or {}).items():
+            if chave in config:
+                config[chave] = type(CONFIG_PADRAO[chave])(valor)
+        return jsonify(config)
+
+    return falso
+
+
+def iniciar_em_thread(porta=8099, config=None):
+    from werkzeug.serving import make_server
+    servidor = make_server('127.0.0.1', porta, criar_app(config), threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == '__main__':
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else 8099
+    print(f"[OK] WhatsApp falso em http://127.0.0.1:{porta} (use TIMESEND_WHATSAPP_URL=http://127.0.0.1:{porta})")
+    criar_app().run(host='127.0.0.1', port=porta, threaded=True)